@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.sparse.linalg import splu
+import monolithic_solver, plot_domain
+
+
+class BatchSolver:
+    """
+    Solves many scenarios (heater, aircon and wall temperatures, open door and
+    oven flags) at the same resolution. The coupled apartment matrix of
+    monolithic_solver only depends on cols, so it is assembled and factorized
+    once and the right hand sides of all scenarios are solved together as the
+    columns of one multi-column solve.
+
+    Attributes:
+    -----------
+    cols : int
+        The number of columns of interior gridpoints.
+
+    apartment : monolithic_solver.MonolithicSolver
+        Provides the coupled matrix and splits the solutions into rooms.
+
+    lu : scipy.sparse.linalg.SuperLU
+        The factorization of the coupled matrix.
+
+    Methods:
+    --------
+    rhs_matrix(self, scenarios)
+        Stacks the right hand sides of the scenarios as columns.
+
+    solve_rooms(self, scenarios)
+        Solves all scenarios and returns the temperatures of every room.
+
+    solve(self, scenarios)
+        Solves all scenarios and returns the stitched apartment fields.
+
+    """
+
+    def __init__(self, cols):
+        """
+
+        Params:
+        -------
+        cols : int
+            The number of columns of interior gridpoints to be solved for.
+
+        """
+        self.cols = cols
+        #the temperatures do not enter the matrix
+        self.apartment = monolithic_solver.MonolithicSolver(0, 0, 0, cols)
+        self.lu = splu(self.apartment.A.tocsc())
+
+    def rhs_matrix(self, scenarios):
+        """
+        Params:
+        -------
+        scenarios : list of dict
+            Every scenario has the keys 'heater', 'aircon' and 'walls', and
+            optionally 'open' and 'on_off' (False by default).
+
+        Returns:
+        --------
+        B : ndarray
+            Array with one right hand side per column.
+
+        """
+        return np.column_stack([monolithic_solver.boundary_rhs(monolithic_solver.apartment_rooms(
+            scenario['heater'], scenario['aircon'], scenario['walls'], self.cols,
+            scenario.get('open', False), scenario.get('on_off', False))) for scenario in scenarios])
+
+    def solve_rooms(self, scenarios):
+        """
+        Params:
+        -------
+        scenarios : list of dict
+            See rhs_matrix.
+
+        Returns:
+        --------
+        solutions : list of tuple
+            The interior temperatures (om1, om2, om3, om4) of every scenario.
+
+        """
+        X = self.lu.solve(self.rhs_matrix(scenarios))
+        return [self.apartment.split(X[:,k]) for k in range(X.shape[1])]
+
+    def solve(self, scenarios):
+        """
+        Params:
+        -------
+        scenarios : list of dict
+            See rhs_matrix.
+
+        Returns:
+        --------
+        apartments : ndarray
+            Array with shape (len(scenarios), 2*cols, 2*cols) holding the
+            apartment of every scenario as stitched by plot_domain.Plotter.
+
+        """
+        if self.cols % 2:
+            raise ValueError('the rooms can only be stitched together for an even number of columns')
+        return np.stack([plot_domain.Plotter(*rooms, scenario['walls']).room
+                         for rooms, scenario in zip(self.solve_rooms(scenarios), scenarios)])
+
+
+def solve_scenarios(cols, scenarios):
+    """
+    Solves a list of scenarios with a single factorization, see BatchSolver.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of interior gridpoints to be solved for.
+
+    scenarios : list of dict
+        See BatchSolver.rhs_matrix.
+
+    Returns:
+    --------
+    apartments : ndarray
+        Array with shape (len(scenarios), 2*cols, 2*cols).
+
+    """
+    return BatchSolver(cols).solve(scenarios)
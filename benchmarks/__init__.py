@@ -0,0 +1,2 @@
+# Benchmarks for the heat equation solver. Run them from the repository root,
+# e.g. python3 -m benchmarks.bench_factorization or python3 -m benchmarks.bench_suite
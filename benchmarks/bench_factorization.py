@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compares the per-iteration cost of solving a room's linear system from
+scratch (numpy/scipy solve or spsolve, the behaviour before the
+factorization was cached) with the triangular solves done against the
+FactorizedMatrix stored by every room.
+
+python3 -m benchmarks.bench_factorization [--cols 10 20 40] [--repeat 5] [--sparse]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.linalg import solve
+from scipy.sparse.linalg import spsolve
+
+import room_bathroom, room_entryway, room_kitchen, room_livingroom
+
+
+def build_rooms(cols, sparse):
+    """
+    Sets up the four rooms with the temperatures used in problem_solver.
+
+    Returns:
+    --------
+    rooms : list of (str, object, ndarray)
+        The room name, the room object and a right hand side vector for it.
+    """
+    livingroom = room_livingroom.LivingRoom(35, 8, 22, cols, False, sparse)
+    kitchen = room_kitchen.Kitchen(35, 8, 22, cols, False, False, sparse)
+    entryway = room_entryway.Entry(35, 8, 22, int(cols/2), sparse)
+    bathroom = room_bathroom.BathRoom(8, 22, int(cols/2), sparse)
+    return [('livingroom', livingroom, livingroom.construct_rhs_vector(livingroom.twestt, livingroom.twestb)),
+            ('kitchen', kitchen, kitchen.construct_rhs_vector(kitchen.tnorth*kitchen.dx)),
+            ('entryway', entryway, entryway.construct_rhs_vector(entryway.tsouth*entryway.dx, entryway.tsouth*entryway.dx)),
+            ('bathroom', bathroom, bathroom.construct_rhs_vector(bathroom.teastt))]
+
+
+def best_time(func, repeat):
+    """Returns the fastest of repeat calls of func in seconds."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cols', type=int, nargs='+', default=[10, 20, 40])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sparse', action='store_true',
+                        help='benchmark the scipy.sparse backend')
+    args = parser.parse_args(argv)
+
+    direct = spsolve if args.sparse else solve
+    print('{:>6} {:>12} {:>14} {:>14} {:>9}'.format('cols', 'room', 'solve [ms]', 'factored [ms]', 'speedup'))
+    for cols in args.cols:
+        for name, room, rhs in build_rooms(cols, args.sparse):
+            before = best_time(lambda: direct(room.behaviour_matrix, rhs), args.repeat)
+            after = best_time(lambda: room.linear_solver.solve(rhs), args.repeat)
+            assert np.allclose(direct(room.behaviour_matrix, rhs), room.linear_solver.solve(rhs))
+            print('{:>6} {:>12} {:>14.3f} {:>14.3f} {:>8.1f}x'.format(
+                cols, name, 1e3*before, 1e3*after, before/after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the room solves and the coupled Dirichlet/Neumann iteration over a
+range of cols and linear solver backends and writes the results as JSON, so
+that runs on different commits can be compared.
+
+For every cols and backend the rooms are set up and solved on their own, then
+the whole apartment is solved to the tolerance. The coupled runs record the
+wall time, the number of iterations, the peak resident memory and how the
+time splits into assembly (setting up the rooms), solves and communication.
+
+python3 -m benchmarks.bench_suite [--cols 10 20 40] [--backends sparse-lu cg fft] [--output bench.json]
+mpirun -n 5 python3 -m benchmarks.bench_suite --engine mpi [--comm-mode buffer]
+
+Serial runs are done one after the other in fresh processes so that the peak
+memory belongs to a single run. Under MPI every process reports its own
+timings and memory, the peak memory is then the largest since the start of
+the benchmark.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import scipy
+
+import instrumentation, interface_exchange, operator_cache
+import room_bathroom, room_entryway, room_kitchen, room_livingroom
+from scheduler import LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM
+
+#backend name: (solver, sparse)
+BACKENDS = {'dense-lu': ('lu', False),
+            'sparse-lu': ('lu', True),
+            'cg': ('cg', True),
+            'gmres': ('gmres', True),
+            'multigrid': ('multigrid', True),
+            'fmg': ('fmg', True),
+            'fft': ('fft', True)}
+
+#the phases of instrumentation.Probe counted towards each part of the coupled run
+PHASES = {'assembly': ('assembly',),
+          'solve': ('construct_rhs_vector', 'solve', 'relaxation'),
+          'communication': instrumentation.WAITS}
+
+
+def peak_rss():
+    """The peak resident memory of this process in MiB."""
+    #kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale/2**20
+
+
+def best_time(func, repeat):
+    """Returns the fastest of repeat calls of func in seconds."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_rooms(cols, backend, repeat):
+    """
+    Sets up every room from scratch and times one solve of it.
+
+    Returns:
+    --------
+    results : list of dict
+        'room', 'unknowns', 'assembly' and 'solve' in seconds for every room.
+    """
+    solver, sparse = BACKENDS[backend]
+    half = int(cols/2)
+    setups = {LIVINGROOM: lambda: room_livingroom.LivingRoom(35, 8, 22, cols, False, sparse, solver),
+              KITCHEN: lambda: room_kitchen.Kitchen(35, 8, 22, cols, False, False, sparse, solver),
+              ENTRYWAY: lambda: room_entryway.Entry(35, 8, 22, half, sparse, solver),
+              BATHROOM: lambda: room_bathroom.BathRoom(8, 22, half, sparse, solver)}
+    results = []
+    for number, setup in setups.items():
+        operator_cache.CACHE.clear()
+        start = time.perf_counter()
+        room = setup()
+        assembly = time.perf_counter() - start
+        rhs = room.rhs_buffer.reshape(-1).copy() - 1.0
+
+        def solve():
+            #iterative solvers start from zero, not from the previous solution
+            if hasattr(room.linear_solver, 'x0'):
+                room.linear_solver.x0 = np.zeros_like(rhs)
+            room.linear_solver.solve(rhs)
+        results.append({'room': number, 'unknowns': rhs.size, 'assembly': assembly,
+                        'solve': best_time(solve, repeat)})
+    operator_cache.CACHE.clear()
+    return results
+
+
+def bench_coupled(cols, backend, iters, tol, engine, comm_mode):
+    """
+    Solves the apartment to the tolerance with the run profiled.
+
+    Returns:
+    --------
+    result : dict
+        The measurements of this process.
+
+    report : instrumentation.Report or None
+        The profile of all processes on process 0.
+    """
+    from problem_solver import Problem
+    solver, sparse = BACKENDS[backend]
+    operator_cache.CACHE.clear()
+    problem = Problem(35, 8, 22)
+    start = time.perf_counter()
+    iterations, residuals = problem(cols, iters, True, True, sparse=sparse, tol=tol,
+                                    comm_mode=comm_mode, engine=engine, solver=solver, profile=True)
+    wall = time.perf_counter() - start
+    operator_cache.CACHE.clear()
+    return ({'wall': wall, 'iterations': iterations, 'residual': residuals[-1] if residuals else None,
+             'converged': bool(residuals) and residuals[-1] < tol, 'peak_rss': peak_rss()}, problem.profile)
+
+
+def phase_times(totals, wall):
+    """Sums the phases of one process into assembly, solve and communication."""
+    phases = {part: sum(totals.get(name, 0.0) for name in names) for part, names in PHASES.items()}
+    phases['other'] = wall - sum(phases.values())
+    return phases
+
+
+def serial_case(case):
+    """Runs one serial case, in a fresh process."""
+    cols, backend, args = case
+    result = {'cols': cols, 'backend': backend, 'engine': 'serial', 'processes': 1}
+    result['rooms'] = bench_rooms(cols, backend, args.repeat)
+    coupled, report = bench_coupled(cols, backend, args.iters, args.tol, 'serial', args.comm_mode)
+    result.update(coupled)
+    result['phases'] = phase_times(report.totals()[0], coupled['wall'])
+    result['traffic'] = report.traffic()
+    result['peak_rss'] = peak_rss()
+    return result
+
+
+def mpi_case(comm, cols, backend, args):
+    """Runs one case on every process and combines the measurements on process 0."""
+    rooms = bench_rooms(cols, backend, args.repeat) if comm.Get_rank() == 0 else None
+    comm.Barrier()
+    coupled, report = bench_coupled(cols, backend, args.iters, args.tol, 'mpi', args.comm_mode)
+    ranks = comm.gather(coupled, root=0)
+    if comm.Get_rank() != 0:
+        return None
+    totals = report.totals()
+    for rank, measured in enumerate(ranks):
+        measured['phases'] = phase_times(totals[rank], measured['wall'])
+    return {'cols': cols, 'backend': backend, 'engine': 'mpi', 'processes': comm.Get_size(), 'rooms': rooms,
+            'wall': max(rank['wall'] for rank in ranks), 'iterations': ranks[0]['iterations'],
+            'residual': ranks[0]['residual'], 'converged': ranks[0]['converged'],
+            'peak_rss': max(rank['peak_rss'] for rank in ranks),
+            'phases': {name: max(rank['phases'][name] for rank in ranks) for name in ranks[0]['phases']},
+            'traffic': report.traffic(), 'imbalance': report.imbalance()['ratio'], 'ranks': ranks}
+
+
+def environment():
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'scipy': scipy.__version__, 'machine': platform.machine(),
+            'platform': platform.platform(), 'cpus': multiprocessing.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cols', type=int, nargs='+', default=[10, 20, 40])
+    parser.add_argument('--backends', nargs='+', default=['dense-lu', 'sparse-lu', 'cg', 'multigrid', 'fft'],
+                        choices=sorted(BACKENDS))
+    parser.add_argument('--engine', choices=['serial', 'mpi'], default='serial')
+    parser.add_argument('--comm-mode', choices=sorted(interface_exchange.EXCHANGES), default='buffer')
+    parser.add_argument('--iters', type=int, default=200,
+                        help='the maximum number of iterations of a coupled run')
+    parser.add_argument('--tol', type=float, default=1e-8)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the number of room solves timed, the fastest is reported')
+    parser.add_argument('--output', default='bench.json')
+    args = parser.parse_args(argv)
+
+    #small cases first, the peak memory of MPI runs only grows
+    cases = [(cols, backend) for cols in sorted(args.cols) for backend in args.backends]
+    if args.engine == 'mpi':
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+        results = [mpi_case(comm, cols, backend, args) for cols, backend in cases]
+        if comm.Get_rank() != 0:
+            return
+    else:
+        with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+            results = pool.map(serial_case, [(cols, backend, args) for cols, backend in cases], chunksize=1)
+
+    report = {'environment': environment(), 'settings': vars(args), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('{:>6} {:>10} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'cols', 'backend', 'iters', 'wall [s]', 'assembly', 'solve', 'comm', 'rss [MiB]'))
+    for result in results:
+        phases = result['phases']
+        print('{:>6} {:>10} {:>6} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.1f}'.format(
+            result['cols'], result['backend'], result['iterations'], result['wall'], phases['assembly'],
+            phases['solve'], phases['communication'], result['peak_rss']))
+
+
+if __name__ == '__main__':
+    main()
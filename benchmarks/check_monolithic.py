@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Checks that the Dirichlet/Neumann iteration converges to the solution of the
+monolithic system (see monolithic_solver) by solving the apartment both ways
+and comparing the room temperatures. Both discretize the same equations, so
+the difference is only the interface residual left by the iteration.
+
+python3 -m benchmarks.check_monolithic [--cols 20 21] [--atol 1e-10]
+
+Exits with status 1 if a case differs by more than atol.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from problem_solver import Problem
+
+
+def max_difference(cols, open, on_off, tol, iters):
+    """
+    Returns:
+    --------
+    difference : float
+        The largest difference of a room temperature between the serial
+        engine and the monolithic solve.
+
+    iterations : int
+        The number of Dirichlet/Neumann iterations of the serial engine.
+    """
+    serial = Problem(35, 8, 22)
+    iterations, residuals = serial(cols, iters, open, on_off, tol=tol, engine='serial')
+    monolithic = Problem(35, 8, 22)
+    monolithic(cols, 1, open, on_off, engine='monolithic')
+    difference = max(float(np.max(np.abs(a - b))) for a, b in
+                     zip((serial.OM1, serial.OM2, serial.OM3, serial.OM4),
+                         (monolithic.OM1, monolithic.OM2, monolithic.OM3, monolithic.OM4)))
+    return difference, iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cols', type=int, nargs='+', default=[20, 21])
+    parser.add_argument('--atol', type=float, default=1e-10,
+                        help='the largest difference accepted')
+    parser.add_argument('--tol', type=float, default=1e-13,
+                        help='the interface residual the iteration is run to')
+    parser.add_argument('--iters', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    failed = 0
+    print('{:>6} {:>6} {:>6} {:>6} {:>12}'.format('cols', 'open', 'oven', 'iters', 'difference'))
+    for cols in args.cols:
+        for open, on_off in ((False, False), (True, True)):
+            difference, iterations = max_difference(cols, open, on_off, args.tol, args.iters)
+            ok = difference <= args.atol
+            failed += not ok
+            print('{:>6} {:>6} {:>6} {:>6} {:>12.3e}{}'.format(cols, str(open), str(on_off), iterations,
+                                                               difference, '' if ok else '  FAILED'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+from scheduler import ROOMS
+
+
+def checkpoint_path(directory, room, iteration):
+    """
+    The file holding the state of one room after an iteration.
+    """
+    return os.path.join(directory, 'room{}_{:08d}.npz'.format(room, iteration))
+
+
+def available(directory):
+    """
+    Lists the checkpoints in a directory.
+
+    Params:
+    -------
+    directory : str
+        The checkpoint directory.
+
+    Returns:
+    --------
+    iterations : dict
+        Maps each room number to the set of iterations it has a checkpoint of.
+
+    """
+    iterations = {room: set() for room in ROOMS}
+    if not os.path.isdir(directory):
+        return iterations
+    for name in os.listdir(directory):
+        match = re.fullmatch(r'room(\d)_(\d+)\.npz', name)
+        if match and int(match.group(1)) in iterations:
+            iterations[int(match.group(1))].add(int(match.group(2)))
+    return iterations
+
+
+def latest(directory):
+    """
+    The last consistent iteration: the last one every room has a checkpoint
+    of, whichever processes owned the rooms.
+
+    Params:
+    -------
+    directory : str
+        The checkpoint directory.
+
+    Returns:
+    --------
+    iteration : int or None
+        None if there is no complete checkpoint.
+
+    """
+    common = set.intersection(*available(directory).values())
+    return max(common) if common else None
+
+
+def clear(directory):
+    """
+    Removes the checkpoints in a directory, so that a new run does not mix its
+    checkpoints with those of an earlier one. Other files are left alone.
+
+    Params:
+    -------
+    directory : str
+        The checkpoint directory.
+
+    Returns:
+    --------
+    None
+
+    """
+    for room, iterations in available(directory).items():
+        for iteration in iterations:
+            os.remove(checkpoint_path(directory, room, iteration))
+
+
+def describe(scenario):
+    """
+    The scenario as stored with every checkpoint, a JSON string.
+    """
+    #numpy scalars, e.g. temperatures taken from an array, as Python numbers
+    return json.dumps(scenario, sort_keys=True, default=lambda value: value.item())
+
+
+def same_scenario(directory, room, iteration, scenario):
+    """
+    Whether a checkpoint was written by a run of the given scenario.
+
+    Params:
+    -------
+    directory : str
+        The checkpoint directory.
+
+    room : int
+        The room number, see scheduler.
+
+    iteration : int
+        The iteration of the checkpoint.
+
+    scenario : dict
+        The settings of the run, as passed to CheckpointWriter.
+
+    Returns:
+    --------
+    same : bool
+        False as well for checkpoints without a scenario.
+
+    """
+    with np.load(checkpoint_path(directory, room, iteration)) as data:
+        if 'scenario' not in data.files:
+            return False
+        stored = str(data['scenario'])
+    #compared as parsed JSON, so that e.g. 35 and 35.0 are the same temperature
+    return json.loads(stored) == json.loads(describe(scenario))
+
+
+def flatten(state, prefix = ''):
+    flat = {}
+    for name, value in state.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + name + '.'))
+        else:
+            #copied here, the arrays of the iteration can change before they are written
+            flat[prefix + name] = np.array(value, dtype=float)
+    return flat
+
+
+def load(directory, room, iteration, names = None):
+    """
+    Reads the checkpoint of one room.
+
+    Params:
+    -------
+    directory : str
+        The checkpoint directory.
+
+    room : int
+        The room number, see scheduler.
+
+    iteration : int
+        The iteration, usually the one returned by latest.
+
+    names : list of str
+        Only read these arrays, e.g. ['residuals'], by default all of them.
+
+    Returns:
+    --------
+    state : dict
+        The arrays written by CheckpointWriter, names containing a dot are
+        returned as nested dicts. The scenario is left out, see
+        same_scenario.
+
+    """
+    state = {}
+    with np.load(checkpoint_path(directory, room, iteration)) as data:
+        if names is None:
+            names = [name for name in data.files if name != 'scenario']
+        for name in names:
+            *parents, leaf = name.split('.')
+            target = state
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = data[name]
+    return state
+
+
+class CheckpointWriter:
+    """
+    Writes the state of the rooms of one process as uncompressed .npz files,
+    one per room and iteration, in a background thread so that the sweeps go
+    on while the files are written. A checkpoint is only started after the
+    previous one of the process is complete, and files are renamed into place
+    once written, so a crash never leaves a half written checkpoint behind.
+    Every file also holds the scenario of the run (see describe), so that a
+    resumed run can tell whether the checkpoints are its own.
+
+    Attributes:
+    -----------
+    directory : str
+        Where the checkpoints are written.
+
+    keep : int
+        The number of checkpoints kept per room, older ones are removed.
+
+    scenario : str
+        The scenario stored with every checkpoint, see describe.
+
+    written : dict
+        Maps each room number to the iterations of its checkpoints, in the
+        order they were written. The oldest ones are removed first, whatever
+        their iteration.
+
+    Methods:
+    --------
+    write(self, iteration, states)
+        Starts writing the states of the rooms after an iteration.
+
+    adopt(self, room, iterations)
+        Takes over checkpoints already in the directory, e.g. when resuming.
+
+    wait(self)
+        Waits for the checkpoint being written and raises its errors.
+
+    """
+
+    def __init__(self, directory, keep = 2, scenario = None):
+        """
+
+        Params:
+        -------
+        directory : str
+            Where the checkpoints are written, created if needed.
+
+        keep : int
+            The number of checkpoints kept per room.
+
+        scenario : dict
+            The settings of the run, e.g. the temperatures, cols and solver,
+            stored with every checkpoint. Plain Python types and numpy
+            scalars.
+
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep = keep
+        self.scenario = describe(scenario or {})
+        self.written = {}
+        self.thread = None
+        self.error = None
+
+    def write(self, iteration, states):
+        """
+        Params:
+        -------
+        iteration : int
+            The number of iterations performed.
+
+        states : dict
+            Maps each room number of this process to a dict of arrays, floats
+            and nested dicts of them.
+
+        Returns:
+        --------
+        None
+
+        """
+        self.wait()
+        snapshot = {room: flatten(state) for room, state in states.items()}
+        self.thread = threading.Thread(target=self.run, args=(iteration, snapshot), daemon=True)
+        self.thread.start()
+
+    def adopt(self, room, iterations):
+        """
+        Params:
+        -------
+        room : int
+            The room number.
+
+        iterations : list of int
+            Iterations of checkpoints of the room in the directory, oldest
+            first. They are removed like the ones written by this writer.
+
+        Returns:
+        --------
+        None
+
+        """
+        self.wait()
+        self.written[room] = list(iterations) + self.written.get(room, [])
+
+    def run(self, iteration, snapshot):
+        try:
+            for room, arrays in snapshot.items():
+                handle, temporary = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(handle, 'wb') as f:
+                    np.savez(f, scenario=np.array(self.scenario), **arrays)
+                os.replace(temporary, checkpoint_path(self.directory, room, iteration))
+                written = [old for old in self.written.get(room, []) if old != iteration] + [iteration]
+                for old in written[:-self.keep]:
+                    path = checkpoint_path(self.directory, room, old)
+                    if os.path.exists(path):
+                        os.remove(path)
+                self.written[room] = written[-self.keep:]
+        except Exception as error:
+            self.error = error
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
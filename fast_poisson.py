@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+
+def transform_pair(n, condition = ''):
+    """
+    The discrete sine/cosine transform diagonalizing the 1D second difference
+    of n gridpoints with the given edges, and its eigenvalues. Every row of the
+    transform is a left eigenvector: DST-I for Dirichlet edges, DCT-I for two
+    Neumann edges, DST-III for a Neumann right edge and DCT-III for a Neumann
+    left edge, whose halved end weights match the factor 2 of the stamp edits.
+
+    Params:
+    -------
+    n : int
+        The number of gridpoints.
+
+    condition : string
+        'l' and 'r' give homogenous Neumann BCs at the left and right edges.
+
+    Returns:
+    --------
+    forward, inverse : callable
+        The transform and its inverse, called as forward(x, axis=...).
+
+    eigenvalues : ndarray
+        The eigenvalue belonging to every transformed entry.
+
+    """
+    #scipy.fft is only loaded by runs using this solver
+    from scipy import fft
+    k = np.arange(n)
+    left, right = 'l' in condition, 'r' in condition
+    if left and right:
+        kind, shift = 1, np.pi*k/(n - 1)
+        forward, inverse = fft.dct, fft.idct
+    elif right:
+        kind, shift = 3, np.pi*(2*k + 1)/(2*n)
+        forward, inverse = fft.dst, fft.idst
+    elif left:
+        kind, shift = 3, np.pi*(2*k + 1)/(2*n)
+        forward, inverse = fft.dct, fft.idct
+    else:
+        kind, shift = 1, np.pi*(k + 1)/(n + 1)
+        forward, inverse = fft.dst, fft.idst
+
+    def apply(x, axis, workers = None):
+        return forward(x, type=kind, axis=axis, workers=workers)
+
+    def invert(x, axis, workers = None):
+        return inverse(x, type=kind, axis=axis, workers=workers)
+
+    return apply, invert, 2*np.cos(shift) - 2
+
+
+class FastPoissonSolver:
+    """
+    Spectral solver for a room. The finite difference matrix of a rectangle is
+    the sum of the second differences along the rows, which always have
+    Dirichlet edges, and along the columns, whose edges follow the condition.
+    Transforming both axes with the matching sine/cosine transforms of
+    scipy.fft makes it diagonal, so every solve is two transforms and a
+    division, O(N log N) without any matrix.
+
+    Attributes:
+    -----------
+    rows, cols : int
+        The shape of the grid.
+
+    condition : string
+        The Neumann BCs, see FiniteDiffMatrix.
+
+    eigenvalues : ndarray
+        Array with shape (rows, cols), the eigenvalue of every transformed
+        entry.
+
+    workers : int or None
+        Number of threads scipy.fft may use, -1 for all cores.
+
+    Methods:
+    --------
+    solve(self, rhs)
+        Solves A*x = rhs.
+
+    """
+
+    def __init__(self, rows, cols, condition = '', workers = None):
+        """
+
+        Params:
+        -------
+        rows, cols : int
+            The shape of the grid, as passed to FiniteDiffMatrix.
+
+        condition : string
+            The Neumann BCs, as passed to FiniteDiffMatrix.
+
+        workers : int
+            Number of threads scipy.fft may use.
+
+        """
+        self.rows = rows
+        self.cols = cols
+        self.condition = condition or ''
+        self.workers = workers
+        self.row_forward, self.row_inverse, row_eigenvalues = transform_pair(rows)
+        self.col_forward, self.col_inverse, col_eigenvalues = transform_pair(cols, self.condition)
+        self.eigenvalues = row_eigenvalues[:,None] + col_eigenvalues[None,:]
+
+    def solve(self, rhs):
+        """
+        Params:
+        -------
+        rhs : ndarray
+            The right hand side vector of length rows*cols.
+
+        Returns:
+        --------
+        x : ndarray
+            The solution of A*x = rhs.
+
+        """
+        b = np.reshape(rhs, (self.rows, self.cols))
+        spectrum = self.col_forward(self.row_forward(b, 0, self.workers), 1, self.workers)
+        spectrum /= self.eigenvalues
+        x = self.col_inverse(self.row_inverse(spectrum, 0, self.workers), 1, self.workers)
+        return x.ravel()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scheduler import LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM
+
+
+def apartment_layout(cols):
+    """
+    Where plot_domain.Plotter.room_setup puts every room in the stitched
+    apartment. The rooms are stored upside down there, see room_view.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of interior gridpoints, must be even.
+
+    Returns:
+    --------
+    layout : dict
+        Maps each room number to the (row slice, column slice) it occupies in
+        the (2*cols, 2*cols) apartment.
+
+    closet : tuple
+        The (row slice, column slice) of the closet next to the entryway,
+        which is filled with the wall temperature.
+
+    """
+    if cols % 2:
+        raise ValueError('the rooms can only be stitched together for an even number of columns')
+    half = cols//2
+    layout = {LIVINGROOM: (slice(0, 2*cols), slice(cols, 2*cols)),
+              KITCHEN: (slice(0, cols), slice(0, cols)),
+              ENTRYWAY: (slice(2*cols - half, 2*cols), slice(half, cols)),
+              BATHROOM: (slice(cols, 2*cols), slice(0, half))}
+    closet = (slice(cols, 2*cols - half), slice(half, cols))
+    return layout, closet
+
+
+def create_field(path, cols, walls):
+    """
+    Creates the .npy file of the apartment and fills the closet, the rooms are
+    written into it later with write_room.
+
+    Params:
+    -------
+    path : str
+        The file to create.
+
+    cols : int
+        The number of columns of interior gridpoints, must be even.
+
+    walls : float
+        The temperature of the closet.
+
+    Returns:
+    --------
+    field : numpy.memmap
+        The writable apartment with shape (2*cols, 2*cols).
+
+    """
+    layout, closet = apartment_layout(cols)
+    field = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(2*cols, 2*cols))
+    field[closet] = walls
+    field.flush()
+    return field
+
+
+def open_field(path, mode = 'r'):
+    """
+    Memory-maps the apartment created by create_field without reading it.
+
+    Params:
+    -------
+    path : str
+        The .npy file.
+
+    mode : str
+        'r' for read only access, 'r+' to write rooms into it.
+
+    Returns:
+    --------
+    field : numpy.memmap
+
+    """
+    return np.load(path, mmap_mode=mode)
+
+
+def room_view(field, room):
+    """
+    The part of the apartment holding a room, oriented like the room's
+    temperature matrix. A view, nothing is copied.
+
+    Params:
+    -------
+    field : ndarray
+        The apartment with shape (2*cols, 2*cols).
+
+    room : int
+        The room number, see scheduler.
+
+    Returns:
+    --------
+    view : ndarray
+        The interior temperatures of the room.
+
+    """
+    layout, closet = apartment_layout(field.shape[1]//2)
+    rows, cols = layout[room]
+    return field[rows, cols][::-1]
+
+
+def write_room(field, room, interior):
+    """
+    Writes the interior temperatures of a room to its place in the apartment.
+
+    Params:
+    -------
+    field : ndarray
+        The apartment with shape (2*cols, 2*cols).
+
+    room : int
+        The room number, see scheduler.
+
+    interior : ndarray
+        The interior temperatures, temperature_matrix[1:-1,1:-1] of the room.
+
+    Returns:
+    --------
+    None
+
+    """
+    room_view(field, room)[...] = interior
+
+
+def write_field(path, om1, om2, om3, om4, walls):
+    """
+    Writes the rooms computed by one process to the apartment file.
+
+    Params:
+    -------
+    path : str
+        The file to create.
+
+    om1, om2, om3, om4 : ndarray
+        The interior temperatures of the living room, kitchen, entryway and
+        bathroom.
+
+    walls : float
+        The temperature of the closet.
+
+    Returns:
+    --------
+    field : numpy.memmap
+        The apartment, opened read only.
+
+    """
+    field = create_field(path, om2.shape[1], walls)
+    for room, interior in zip((LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM), (om1, om2, om3, om4)):
+        write_room(field, room, interior)
+    field.flush()
+    del field
+    return open_field(path)
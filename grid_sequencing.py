@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import initial_guess
+
+#the options of Problem.__call__ that name files, they belong to the finest level
+FINEST_ONLY = ('output', 'checkpoint', 'checkpoint_every', 'resume')
+
+
+def resolution_levels(cols, coarsest = 10):
+    """
+    The numbers of columns solved for on the way to cols, each level doubling
+    the previous one.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of interior gridpoints wanted.
+
+    coarsest : int
+        The smallest number of columns used.
+
+    Returns:
+    --------
+    levels : list of int
+        Increasing numbers of columns ending with cols.
+
+    """
+    levels = [cols]
+    while levels[-1]//2 >= coarsest:
+        levels.append(levels[-1]//2)
+    return levels[::-1]
+
+
+class GridSequencer:
+    """
+    Solves the apartment at a coarse resolution first and uses every converged
+    solution, the room temperatures and interface data interpolated to twice
+    the number of columns, as the initial guess of the next finer one (see
+    initial_guess), until the resolution wanted is reached. The coarse levels
+    are cheap and remove most of the smooth initial error before the finest
+    level starts. The Dirichlet/Neumann iteration converges at a rate set by
+    the coupling of the rooms rather than by the initial error, though, so the
+    finest level needs about as many sweeps as from the wall temperatures
+    (14 with or without the coarse levels at cols 40 and tol 1e-8); the warm
+    start mostly helps when the finest level is stopped after a few sweeps.
+
+    Attributes:
+    -----------
+    problem : problem_solver.Problem
+        The problem solved, it holds the solution of the last level.
+
+    coarsest : int
+        The smallest number of columns used.
+
+    coarse_tol : float
+        The tolerance of the coarse levels. Their solutions differ from the
+        finest one by the discretization error anyway, so solving them more
+        accurately does not improve the initial guess.
+
+    history : list of dict
+        The 'cols', 'iterations' and 'residuals' of every level of the last
+        call.
+
+    Methods:
+    --------
+    __call__(self, cols, iters, **options)
+        Solves the problem for cols columns.
+
+    """
+
+    def __init__(self, problem, coarsest = 10, coarse_tol = 1e-3):
+        """
+
+        Params:
+        -------
+        problem : problem_solver.Problem
+            The problem to be solved.
+
+        coarsest : int
+            The smallest number of columns used.
+
+        coarse_tol : float
+            The tolerance of the coarse levels, the tol passed to __call__ is
+            used if it is larger.
+
+        """
+        self.problem = problem
+        self.coarsest = coarsest
+        self.coarse_tol = coarse_tol
+        self.history = []
+
+    def __call__(self, cols, iters, **options):
+        """
+        Params:
+        -------
+        cols : int
+            The number of columns of interior gridpoints wanted.
+
+        iters : int
+            The maximum number of iterations of every level, use together with
+            tol.
+
+        options :
+            Passed on to Problem.__call__ for every level, e.g. open, on_off,
+            tol, engine or solver. Without tol every level performs iters
+            iterations. output, checkpoint, checkpoint_every and resume only
+            apply to the finest level, the coarse levels neither write nor
+            read files.
+
+        Returns:
+        --------
+        iterations : int
+            The number of iterations performed at the finest level.
+
+        residuals : list of float
+            The interface residual after every iteration of the finest level.
+
+        """
+        self.history = []
+        guess = None
+        tol = options.pop('tol', None)
+        levels = resolution_levels(cols, self.coarsest)
+        finest = {name: options.pop(name) for name in FINEST_ONLY if name in options}
+        for level, finer in zip(levels, levels[1:] + [None]):
+            level_tol = tol
+            if tol is not None and finer is not None:
+                level_tol = max(tol, self.coarse_tol)
+            level_options = dict(options, **finest) if finer is None else options
+            iterations, residuals = self.problem(level, iters, tol=level_tol, warm_start=guess, **level_options)
+            self.history.append({'cols': level, 'iterations': iterations, 'residuals': residuals})
+            #only process 0 holds the solution, the others get the guess from it
+            guess = None
+            if finer is not None and self.problem.OM1 is not None:
+                guess = initial_guess.make_initial_guess(self.problem, finer)
+        return iterations, residuals
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scheduler import LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM
+
+
+def room_shapes(cols):
+    """
+    The shapes of the interior temperatures OM1-OM4 for a number of columns.
+    """
+    half = int(cols/2)
+    return {LIVINGROOM: (2*cols, cols), KITCHEN: (cols, cols),
+            ENTRYWAY: (half, half), BATHROOM: (2*half, half)}
+
+
+def resample(field, shape):
+    """
+    Linearly interpolates the interior temperatures of a room onto a grid with
+    a different number of points. Both grids are spread evenly over the room,
+    the walls at positions 0 and 1 are not part of them.
+
+    Params:
+    -------
+    field : ndarray
+        The interior temperatures, or the temperatures along an interface.
+
+    shape : tuple
+        The shape wanted.
+
+    Returns:
+    --------
+    resampled : ndarray
+        Array with the given shape.
+
+    """
+    field = np.asarray(field, dtype=float)
+    shape = tuple(shape)
+    if field.shape == shape:
+        return field.copy()
+    #scipy.interpolate is slow to import and only needed for warm starts
+    from scipy.interpolate import RegularGridInterpolator
+    old = [(np.arange(n) + 1)/(n + 1) for n in field.shape]
+    new = [(np.arange(n) + 1)/(n + 1) for n in shape]
+    interpolator = RegularGridInterpolator(old, field, bounds_error=False, fill_value=None)
+    points = np.stack(np.meshgrid(*new, indexing='ij'), axis=-1)
+    return interpolator(points)
+
+
+class InitialGuess:
+    """
+    Starting values for the Dirichlet/Neumann iteration taken from a previous
+    result, e.g. a nearby scenario or the same apartment at a coarser
+    resolution. The rooms and interface temperatures are interpolated to the
+    number of columns wanted.
+
+    The interface temperatures are the ones the Dirichlet rooms would have used
+    in the next sweep, recorded by Solver.dirichelt_neumann_iteration in
+    Problem.interfaces. Without them they are estimated from the two rooms'
+    columns closest to each interface, which is less accurate since the
+    interior temperatures do not include the interface itself.
+
+    Attributes:
+    -----------
+    cols : int
+        The number of columns of interior gridpoints the guess is made for.
+
+    fields : dict
+        The interior temperatures of every room, keyed by room number.
+
+    kitchen : ndarray
+        The temperatures of the interface between kitchen and living room.
+
+    entry_east : ndarray
+        The temperatures of the interface between entryway and living room.
+
+    entry_west : ndarray
+        The temperatures of the interface between bathroom and entryway.
+
+    Methods:
+    --------
+    seed(self, room, number)
+        Sets the temperatures of a room and the starting guess of its solver.
+
+    """
+
+    def __init__(self, om1, om2, om3, om4, cols = None, interfaces = None):
+        """
+
+        Params:
+        -------
+        om1, om2, om3, om4 : ndarray
+            The interior temperatures of the living room, kitchen, entryway and
+            bathroom, as computed by Problem.
+
+        cols : int
+            The number of columns the guess is made for, by default the one of
+            the previous result.
+
+        interfaces : dict
+            The interface temperatures 'kitchen', 'entry_east' and 'entry_west'
+            of the previous result, see Problem.interfaces.
+
+        """
+        if cols is None:
+            cols = om2.shape[1]
+        self.cols = cols
+        half = int(cols/2)
+        shapes = room_shapes(cols)
+        self.fields = {room: resample(field, shapes[room])
+                       for room, field in zip((LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM), (om1, om2, om3, om4))}
+        living, kitchen, entry, bath = (self.fields[room] for room in (LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM))
+        if interfaces is not None:
+            self.kitchen = resample(interfaces['kitchen'], (cols,))
+            self.entry_east = resample(interfaces['entry_east'], (half,))
+            self.entry_west = resample(interfaces['entry_west'], (half,))
+        else:
+            #the interface lies one gridpoint past the Neumann room's last interior
+            #column and two before the Dirichlet room's first one
+            self.kitchen = (2*kitchen[:,-1] + living[cols:,0])/3
+            self.entry_east = (2*entry[:,-1] + living[:half,0])/3
+            self.entry_west = (bath[:half,-1] + 2*entry[:,0])/3
+
+    def seed(self, room, number):
+        """
+        Params:
+        -------
+        room : LivingRoom, Kitchen, Entry or BathRoom
+            The room.
+
+        number : int
+            The room number, see scheduler.
+
+        Returns:
+        --------
+        None
+
+        """
+        #the unknowns on the room's edges are taken from the nearest interior point
+        padded = np.pad(self.fields[number], 1, mode='edge')
+        room.temperature_matrix = padded
+        if hasattr(room.linear_solver, 'x0'):
+            room.linear_solver.x0 = padded.ravel().copy()
+
+
+def make_initial_guess(previous, cols):
+    """
+    Creates the initial guess for a run from a previous result.
+
+    Params:
+    -------
+    previous : Problem, tuple or InitialGuess
+        A Problem that has been solved, a tuple (om1, om2, om3, om4) of the
+        interior temperatures or an InitialGuess. The interface temperatures
+        of a Problem are used if it recorded them.
+
+    cols : int
+        The number of columns of interior gridpoints of the new run.
+
+    Returns:
+    --------
+    guess : InitialGuess
+
+    """
+    if isinstance(previous, InitialGuess):
+        if previous.cols == cols:
+            return previous
+        interfaces = {'kitchen': previous.kitchen, 'entry_east': previous.entry_east,
+                      'entry_west': previous.entry_west}
+        fields = [previous.fields[room] for room in (LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM)]
+    elif hasattr(previous, 'OM1'):
+        interfaces = getattr(previous, 'interfaces', None)
+        fields = (previous.OM1, previous.OM2, previous.OM3, previous.OM4)
+    else:
+        interfaces, fields = None, previous
+    return InitialGuess(*fields, cols=cols, interfaces=interfaces)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+#the phases counted as waiting for other processes
+WAITS = ('send', 'recv', 'flush', 'allreduce')
+
+
+class NullProbe:
+    """
+    The probe used when a run is not profiled. Every method does nothing and
+    the rooms and the exchange are left as they are, so the iteration only
+    pays for a few empty calls per sweep.
+    """
+
+    enabled = False
+    _nothing = nullcontext()
+
+    def phase(self, name):
+        return self._nothing
+
+    def next_iteration(self, iteration):
+        pass
+
+    def instrument_room(self, room):
+        pass
+
+    def instrument_exchange(self, exchange):
+        return exchange
+
+    def report(self, comm):
+        return None
+
+
+NULL_PROBE = NullProbe()
+
+
+class Probe:
+    """
+    Records how long one process spends in every phase of the Dirichlet/Neumann
+    iteration and how many bytes it exchanges per message tag.
+
+    The phases are 'assembly' (setting up the rooms), 'construct_rhs_vector'
+    and 'solve' of the rooms, 'relaxation', the communication calls 'send',
+    'recv' (blocking until the data has arrived), 'flush' (completing the
+    sends) and the 'allreduce' of the residual, and 'checkpoint'. Every phase
+    is stored as an event with its start, end and iteration.
+
+    Attributes:
+    -----------
+    rank : int
+        The rank of the process.
+
+    origin : float
+        The time the probe was created, event times are relative to it.
+
+    iteration : int
+        The iteration the next events belong to, 0 during the setup.
+
+    events : list of tuple
+        (name, iteration, start, end) of every phase, in seconds.
+
+    traffic : dict
+        Maps message tags to {'sent': bytes, 'received': bytes}. Messages
+        between rooms of the same process are not counted.
+
+    Methods:
+    --------
+    phase(self, name)
+        Context manager recording an event.
+
+    next_iteration(self, iteration)
+        Starts a new iteration.
+
+    instrument_room(self, room)
+        Times the construct_rhs_vector and solve calls of a room.
+
+    instrument_exchange(self, exchange)
+        Wraps an interface exchange to time it and count its bytes.
+
+    report(self, comm)
+        Gathers the probes of all processes into a Report on process 0.
+
+    """
+
+    enabled = True
+
+    def __init__(self, rank = 0):
+        self.rank = rank
+        self.origin = time.perf_counter()
+        self.iteration = 0
+        self.events = []
+        self.traffic = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.events.append((name, self.iteration, start - self.origin, time.perf_counter() - self.origin))
+
+    def next_iteration(self, iteration):
+        self.iteration = iteration
+
+    def timed(self, name, function):
+        def timed_function(*args, **kwargs):
+            with self.phase(name):
+                return function(*args, **kwargs)
+        return timed_function
+
+    def instrument_room(self, room):
+        #instance attributes, the classes and other rooms are left alone
+        room.construct_rhs_vector = self.timed('construct_rhs_vector', room.construct_rhs_vector)
+        room.linear_solver.solve = self.timed('solve', room.linear_solver.solve)
+
+    def instrument_exchange(self, exchange):
+        return InstrumentedExchange(exchange, self)
+
+    def count(self, tag, direction, data):
+        traffic = self.traffic.setdefault(tag, {'sent': 0, 'received': 0})
+        traffic[direction] += np.asarray(data).nbytes
+
+    def report(self, comm):
+        """
+        Params:
+        -------
+        comm : MPI.Comm or interface_exchange.SerialComm
+            The communicator of the run, every process has to call report.
+
+        Returns:
+        --------
+        report : Report or None
+            The report of all processes on process 0, None on the others.
+
+        """
+        probes = comm.gather({'rank': self.rank, 'events': self.events, 'traffic': self.traffic}, root=0)
+        if probes is None:
+            return None
+        return Report(probes)
+
+
+class InstrumentedExchange:
+    """
+    Wraps the exchange of a profiled run (see interface_exchange), timing its
+    calls and counting the bytes of every message that goes through MPI.
+    """
+
+    def __init__(self, exchange, probe):
+        self.exchange = exchange
+        self.probe = probe
+
+    def __getattr__(self, name):
+        return getattr(self.exchange, name)
+
+    def send(self, data, dest, tag):
+        if not self.exchange.is_local(dest):
+            self.probe.count(tag, 'sent', data)
+        with self.probe.phase('send'):
+            self.exchange.send(data, dest, tag)
+
+    def recv(self, source, tag):
+        with self.probe.phase('recv'):
+            data = self.exchange.recv(source, tag)
+        if not self.exchange.is_local(source):
+            self.probe.count(tag, 'received', data)
+        return data
+
+    def recv_all(self, messages):
+        with self.probe.phase('recv'):
+            received = self.exchange.recv_all(messages)
+        for (source, tag), data in zip(messages, received):
+            if not self.exchange.is_local(source):
+                self.probe.count(tag, 'received', data)
+        return received
+
+    def flush(self):
+        with self.probe.phase('flush'):
+            self.exchange.flush()
+
+
+class Report:
+    """
+    The profile of a run gathered from all processes.
+
+    Attributes:
+    -----------
+    ranks : list of dict
+        'rank', 'events' and 'traffic' of every process, see Probe.
+
+    Methods:
+    --------
+    totals(self)
+        The time of every phase summed per process.
+
+    per_iteration(self, rank)
+        The time of every phase in each iteration of a process.
+
+    traffic(self)
+        The bytes sent and received per tag over all processes.
+
+    imbalance(self)
+        How unevenly the work is spread over the processes.
+
+    as_dict(self)
+        Everything above as plain Python types, e.g. for json.
+
+    chrome_trace(self, path)
+        Writes the events in the Chrome trace event format.
+
+    """
+
+    def __init__(self, ranks):
+        self.ranks = sorted(ranks, key=lambda probe: probe['rank'])
+
+    def totals(self):
+        """
+        Returns:
+        --------
+        totals : dict
+            Maps every rank to a dict of seconds per phase.
+        """
+        totals = {}
+        for probe in self.ranks:
+            phases = totals.setdefault(probe['rank'], {})
+            for name, iteration, start, end in probe['events']:
+                phases[name] = phases.get(name, 0.0) + end - start
+        return totals
+
+    def per_iteration(self, rank):
+        """
+        Params:
+        -------
+        rank : int
+            The process.
+
+        Returns:
+        --------
+        times : dict
+            Maps every phase to an array of the seconds spent in it in each
+            iteration, index 0 being the setup.
+        """
+        events = next(probe['events'] for probe in self.ranks if probe['rank'] == rank)
+        iterations = max([iteration for name, iteration, start, end in events], default=0) + 1
+        times = {}
+        for name, iteration, start, end in events:
+            times.setdefault(name, np.zeros(iterations))[iteration] += end - start
+        return times
+
+    def traffic(self):
+        """
+        Returns:
+        --------
+        traffic : dict
+            Maps every tag to {'sent': bytes, 'received': bytes}.
+        """
+        traffic = {}
+        for probe in self.ranks:
+            for tag, counts in probe['traffic'].items():
+                total = traffic.setdefault(tag, {'sent': 0, 'received': 0})
+                total['sent'] += counts['sent']
+                total['received'] += counts['received']
+        return dict(sorted(traffic.items()))
+
+    def imbalance(self):
+        """
+        The work of a process is the time it is not waiting for the others
+        (see WAITS) or setting up its rooms.
+
+        Returns:
+        --------
+        imbalance : dict
+            'work' and 'waits', the seconds of every rank, and 'ratio', the
+            largest work divided by the mean work of the ranks that have any
+            (1 is perfectly balanced).
+        """
+        work, waits = {}, {}
+        for rank, phases in self.totals().items():
+            waits[rank] = sum(phases.get(name, 0.0) for name in WAITS)
+            work[rank] = sum(seconds for name, seconds in phases.items()
+                             if name not in WAITS and name != 'assembly')
+        busy = [seconds for seconds in work.values() if seconds > 0]
+        ratio = max(busy)/np.mean(busy) if busy else 1.0
+        return {'work': work, 'waits': waits, 'ratio': float(ratio)}
+
+    def as_dict(self):
+        return {'totals': self.totals(),
+                'iterations': {probe['rank']: {name: times.tolist() for name, times in
+                                               self.per_iteration(probe['rank']).items()}
+                               for probe in self.ranks},
+                'traffic': self.traffic(),
+                'imbalance': self.imbalance()}
+
+    def chrome_trace(self, path):
+        """
+        Writes the events as a trace that chrome://tracing and Perfetto can
+        open, one row per rank. The clocks of the ranks are not synchronized,
+        each row starts when its probe was created.
+
+        Params:
+        -------
+        path : str
+            The .json file written.
+
+        Returns:
+        --------
+        None
+
+        """
+        events = []
+        for probe in self.ranks:
+            rank = probe['rank']
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': rank, 'tid': 0,
+                           'args': {'name': 'rank {}'.format(rank)}})
+            for name, iteration, start, end in probe['events']:
+                events.append({'name': name, 'ph': 'X', 'pid': rank, 'tid': 0, 'ts': 1e6*start,
+                               'dur': 1e6*(end - start), 'args': {'iteration': iteration}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
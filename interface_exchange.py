@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import scheduler
+
+
+def interface_shapes(cols):
+    """
+    The shapes of every message exchanged by the Dirichlet/Neumann iteration
+    for a given number of columns, keyed by message tag. The first digit of a
+    tag is the sending room and the second the receiving one, the tags 10-40
+    carry the final room temperatures to the collector on process 0.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of interior gridpoints of the living room.
+
+    Returns:
+    --------
+    shapes : dict
+        Maps each tag to the shape of the array sent with it.
+
+    """
+    half = int(cols/2)
+    return {12: (cols,), 21: (cols,),
+            13: (half,), 31: (half,),
+            34: (half,), 43: (half,),
+            10: (2*cols, cols), 20: (cols, cols),
+            30: (half, half), 40: (2*half, half)}
+
+
+class SerialComm:
+    """
+    Stands in for an MPI communicator when every room is solved in a single
+    process, so the Dirichlet/Neumann iteration can run without mpirun and
+    without importing mpi4py.
+
+    Methods:
+    --------
+    Get_rank(self)
+        Always 0.
+
+    Get_size(self)
+        Always 1.
+
+    allreduce(self, value, op)
+        Returns value, the reduction over a single process.
+
+    Barrier(self)
+        Returns immediately.
+
+    bcast(self, value, root)
+        Returns value.
+
+    gather(self, value, root)
+        Returns [value].
+
+    """
+
+    def Get_rank(self):
+        return 0
+
+    def Get_size(self):
+        return 1
+
+    def allreduce(self, value, op = None):
+        return value
+
+    def Barrier(self):
+        pass
+
+    def bcast(self, value, root = 0):
+        return value
+
+    def gather(self, value, root = 0):
+        return [value]
+
+
+class PickleExchange:
+    """
+    Sends the interface data between rooms with the lowercase, pickle based
+    mpi4py calls. Messages are addressed by room number and routed to the
+    process owning the room; messages between two rooms on the same process
+    are handed over directly without going through MPI.
+
+    Sends are nonblocking and are completed by flush at the end of each sweep,
+    so that two processes owning several rooms can never wait on each other.
+
+    Attributes:
+    -----------
+    comm : MPI.Comm
+        The communicator used.
+
+    rank : int
+        The rank of this process.
+
+    schedule : scheduler.RoomScheduler
+        The mapping of the rooms onto the processes.
+
+    mailbox : dict
+        Messages sent between rooms on this process, keyed by message tag.
+
+    pending : dict
+        The outstanding send request and its data keyed by message tag.
+
+    Methods:
+    --------
+    send(self, data, dest, tag)
+        Sends an array to room dest.
+
+    recv(self, source, tag)
+        Receives an array from room source.
+
+    recv_all(self, messages)
+        Receives several arrays, given as a list of (source, tag) pairs.
+
+    flush(self)
+        Completes all outstanding sends.
+
+    """
+
+    def __init__(self, comm, cols, schedule):
+        self.comm = comm
+        self.rank = comm.Get_rank()
+        self.schedule = schedule
+        self.mailbox = {}
+        self.pending = {}
+
+    def is_local(self, room):
+        return self.schedule.owner(room) == self.rank
+
+    def send(self, data, dest, tag):
+        if self.is_local(dest):
+            self.mailbox[tag] = data
+        else:
+            if tag in self.pending:
+                self.pending.pop(tag)[0].wait()
+            self.pending[tag] = (self.isend(data, self.schedule.owner(dest), tag), data)
+
+    def isend(self, data, dest, tag):
+        return self.comm.isend(data, dest=dest, tag=tag)
+
+    def recv(self, source, tag):
+        if self.is_local(source):
+            return self.mailbox.pop(tag)
+        return self.comm.recv(source=self.schedule.owner(source), tag=tag)
+
+    def recv_all(self, messages):
+        return [self.recv(source, tag) for source, tag in messages]
+
+    def flush(self):
+        for request, data in self.pending.values():
+            request.wait()
+        self.pending = {}
+
+
+class BufferExchange(PickleExchange):
+    """
+    Sends the interface data through the buffer protocol with the uppercase
+    Isend/Recv calls. Receive buffers are allocated once from the room geometry
+    and reused, so an array returned by recv is only valid until the next
+    message with the same tag arrives.
+
+    Attributes:
+    -----------
+    buffers : dict
+        Preallocated float64 receive buffers keyed by message tag.
+
+    """
+
+    def __init__(self, comm, cols, schedule):
+        PickleExchange.__init__(self, comm, cols, schedule)
+        self.buffers = {tag: np.empty(shape) for tag, shape in interface_shapes(cols).items()}
+
+    def isend(self, data, dest, tag):
+        return self.comm.Isend(data, dest=dest, tag=tag)
+
+    def send(self, data, dest, tag):
+        if not self.is_local(dest):
+            #the converted array is kept in pending until the send has completed
+            data = np.ascontiguousarray(data, dtype=np.float64)
+        PickleExchange.send(self, data, dest, tag)
+
+    def recv(self, source, tag):
+        if self.is_local(source):
+            return self.mailbox.pop(tag)
+        self.comm.Recv(self.buffers[tag], source=self.schedule.owner(source), tag=tag)
+        return self.buffers[tag]
+
+
+class NonblockingExchange(BufferExchange):
+    """
+    Buffer based exchange that also receives with Irecv. recv_all posts all
+    receives before waiting on any of them so a room with two neighbours (the
+    living room and the entryway) receives from both at the same time.
+
+    """
+
+    def recv_all(self, messages):
+        received = {}
+        requests = []
+        for source, tag in messages:
+            if self.is_local(source):
+                received[tag] = self.mailbox.pop(tag)
+            else:
+                received[tag] = self.buffers[tag]
+                requests.append(self.comm.Irecv(self.buffers[tag], source=self.schedule.owner(source), tag=tag))
+        if requests:
+            requests[0].Waitall(requests)
+        return [received[tag] for source, tag in messages]
+
+    def recv(self, source, tag):
+        return self.recv_all([(source, tag)])[0]
+
+
+EXCHANGES = {'pickle': PickleExchange,
+             'buffer': BufferExchange,
+             'nonblocking': NonblockingExchange}
+
+
+def make_exchange(comm, cols, mode = 'buffer', schedule = None):
+    """
+    Creates the communication layer used by the Dirichlet/Neumann iteration.
+
+    Params:
+    -------
+    comm : MPI.Comm
+        The communicator used.
+
+    cols : int
+        The number of columns of interior gridpoints, determines the size of
+        the receive buffers.
+
+    mode : str
+        'pickle' for the lowercase isend/recv, 'buffer' for Isend/Recv with
+        preallocated receive buffers and 'nonblocking' for Isend/Irecv.
+
+    schedule : scheduler.RoomScheduler
+        The mapping of rooms onto processes, by default the one computed for
+        the size of comm.
+
+    Returns:
+    --------
+    exchange : PickleExchange
+
+    """
+    if schedule is None:
+        schedule = scheduler.RoomScheduler(comm.Get_size(), cols)
+    try:
+        return EXCHANGES[mode](comm, cols, schedule)
+    except KeyError:
+        raise ValueError('unknown communication mode {!r}, expected one of {}'.format(
+            mode, ', '.join(sorted(EXCHANGES))))
@@ -6,8 +6,11 @@
 # @Last modified time: 2020-08-28T16:50:19+02:00
 
 
-from scipy import *
 import numpy as np
+import scipy.sparse as sp
+import stencil_operator, multigrid, fast_poisson
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import splu
 
 
 class FiniteDiffMatrix:
@@ -40,7 +43,11 @@ class FiniteDiffMatrix:
         Array with shape (cols,cols) describing how solution is calculated and
         accounts for the stated boundary conditions.
 
-    A : ndarray
+    sparse : bool
+        If True the stamp and the solution matrix are assembled as scipy.sparse
+        matrices (CSR) instead of dense ndarrays.
+
+    A : ndarray or scipy.sparse.csr_matrix
         The matrix needed to solve the linear equation A*x = b where * denotes
         classical matrix multiplication.
 
@@ -56,7 +63,7 @@ class FiniteDiffMatrix:
 
     """
 
-    def __init__(self, rows, cols, condition = None):
+    def __init__(self, rows, cols, condition = None, sparse = False, assemble = True):
         """
 
         Params:
@@ -82,7 +89,15 @@ class FiniteDiffMatrix:
             Array with shape (cols,cols) describing how solution is calculated and
             accounts for the stated boundary conditions.
 
-        A : ndarray
+        sparse : bool
+            If True assemble the matrix in scipy.sparse CSR format, keeping the
+            memory footprint O(rows*cols) instead of O((rows*cols)^2).
+
+        assemble : bool
+            If False the matrix is not built at all and A is None, for
+            matrix-free solvers.
+
+        A : ndarray or scipy.sparse.csr_matrix
             The matrix needed to solve the linear equation A*x = b where * denotes
             classical matrix multiplication.
 
@@ -90,7 +105,11 @@ class FiniteDiffMatrix:
         self.cols = cols
         self.rows = rows
         self.squaredim = rows*cols
-        self.A = self.create_solution_matrix(self.create_kron_stamp(condition))
+        self.sparse = sparse
+        self.condition = condition
+        self.A = None
+        if assemble:
+            self.A = self.create_solution_matrix(self.create_kron_stamp(condition))
 
     def create_solution_matrix(self, stamp):
         """
@@ -100,16 +119,23 @@ class FiniteDiffMatrix:
 
         Params:
         -------
-        stamp : ndarray
+        stamp : ndarray or scipy.sparse matrix
             The pattern for a solving for a single row of unknown temperture
             values.
 
         Returns:
         --------
-        A : ndarray
+        A : ndarray or scipy.sparse.csr_matrix
             The matrix needed to solve the linear equation A*x = b where * denotes
             classical matrix multiplication.
         """
+        if self.sparse:
+            #same kronecker construction without ever forming a dense block
+            A = (sp.kron(sp.identity(self.rows, format='csr'), stamp, format='csr')
+                + sp.diags([np.ones(self.squaredim-self.cols)]*2,
+                           [self.cols, -self.cols], format='csr'))
+            return A
+
         #produces main finite diffence matrix using kronecker product
         A = (np.kron(np.eye(self.rows),stamp)
             #concatenates the sub and super off diagonals
@@ -135,14 +161,21 @@ class FiniteDiffMatrix:
 
         Returns:
         --------
-        stamp: ndarray
+        stamp: ndarray or scipy.sparse.csr_matrix
             The matrix with the pattern to be used in the Kronecker product.
 
         """
+        if condition is None:
+            condition = ''
+
         #first outline the generic stamp for Dirichlet boundary conditions
-        stamp = (np.diagflat([-4]*self.cols)
-                + np.diag([1]*(self.cols - 1), k=1)
-                + np.diag([1]*(self.cols - 1),k=-1))
+        if self.sparse:
+            stamp = sp.diags([[-4.]*self.cols, [1.]*(self.cols - 1), [1.]*(self.cols - 1)],
+                             [0, 1, -1], format='lil')
+        else:
+            stamp = (np.diagflat([-4]*self.cols)
+                    + np.diag([1]*(self.cols - 1), k=1)
+                    + np.diag([1]*(self.cols - 1),k=-1))
 
         #Adjusts kronecker product stamp to include left neumann BCs
         if 'l' in condition:
@@ -153,4 +186,122 @@ class FiniteDiffMatrix:
             stamp[-1,-2] = 2
         else:
             stamp = stamp
+
+        if self.sparse:
+            stamp = stamp.tocsr()
         return stamp
+
+
+class FactorizedMatrix:
+
+    """
+    Holds the LU factorization of a finite difference matrix so that the
+    matrix is only factorized once per room. Each step of the Dirichlet/Neumann
+    iteration then only needs the forward and backward triangular solves.
+
+    Attributes:
+    -----------
+    sparse : bool
+        True if the factorization was computed with scipy.sparse.linalg.splu,
+        False if it was computed with scipy.linalg.lu_factor.
+
+    lu : tuple or scipy.sparse.linalg.SuperLU
+        The factorization of the matrix.
+
+    Methods:
+    --------
+    solve(self, rhs)
+        Solves A*x = rhs using the stored factorization.
+
+    """
+
+    def __init__(self, A, lu = None):
+        """
+
+        Params:
+        -------
+        A : ndarray or scipy.sparse matrix
+            The finite difference matrix to be factorized.
+
+        lu : tuple
+            The (lu, piv) factors of a dense A computed earlier, e.g. loaded
+            from disk by operator_cache, to skip the factorization.
+
+        """
+        self.sparse = sp.issparse(A)
+        if lu is not None:
+            self.lu = lu
+        elif self.sparse:
+            self.lu = splu(A.tocsc())
+        else:
+            self.lu = lu_factor(A)
+
+    def solve(self, rhs):
+        """
+        Performs the triangular solves with the stored factorization.
+
+        Params:
+        -------
+        rhs : ndarray
+            The right hand side vector, or a (n, k) array of k right hand sides.
+
+        Returns:
+        --------
+        x : ndarray
+            The solution of A*x = rhs.
+
+        """
+        if self.sparse:
+            return self.lu.solve(rhs)
+        return lu_solve(self.lu, rhs)
+
+
+#solvers that never need the assembled matrix
+MATRIX_FREE_SOLVERS = ('cg', 'gmres', 'fft')
+
+#multigrid cycle of each multigrid solver, they build their own sparse matrices
+MULTIGRID_SOLVERS = {'multigrid': 'v', 'fmg': 'fmg'}
+
+
+def needs_matrix(solver):
+    """
+    Whether a room has to assemble its finite difference matrix for solver.
+    """
+    return solver not in MATRIX_FREE_SOLVERS and solver not in MULTIGRID_SOLVERS
+
+
+def make_solver(matrix, solver = 'lu'):
+    """
+    Sets up the linear solver a room uses at every step of the iteration.
+
+    Params:
+    -------
+    matrix : FiniteDiffMatrix
+        The finite difference matrix of the room.
+
+    solver : str or None
+        'lu' factorizes the matrix once with FactorizedMatrix. 'cg' and 'gmres'
+        use a matrix-free stencil_operator.KrylovSolver. 'multigrid' and 'fmg'
+        use a multigrid.MultigridSolver with V-cycles or full multigrid. 'fft'
+        uses the spectral fast_poisson.FastPoissonSolver. None
+        sets up no solver, for rooms that are only used to assemble a larger
+        system.
+
+    Returns:
+    --------
+    solver : FactorizedMatrix, stencil_operator.KrylovSolver, multigrid.MultigridSolver,
+             fast_poisson.FastPoissonSolver or None
+        Object whose solve(rhs) method solves matrix.A*x = rhs.
+
+    """
+    if solver is None:
+        return None
+    if solver == 'lu':
+        return FactorizedMatrix(matrix.A)
+    if solver in ('cg', 'gmres'):
+        return stencil_operator.KrylovSolver(matrix.rows, matrix.cols, matrix.condition, solver)
+    if solver == 'fft':
+        return fast_poisson.FastPoissonSolver(matrix.rows, matrix.cols, matrix.condition)
+    if solver in MULTIGRID_SOLVERS:
+        return multigrid.MultigridSolver(matrix.rows, matrix.cols, matrix.condition, MULTIGRID_SOLVERS[solver])
+    raise ValueError("unknown solver {!r}, expected 'lu', 'cg', 'gmres', 'multigrid', 'fmg', 'fft' or None".format(solver))
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+import room_kitchen, room_bathroom, room_livingroom, room_entryway
+
+
+def column_selector(offset, shape, col, first, n, size):
+    """
+    Sparse matrix picking n consecutive entries of one column of a room's
+    temperature matrix out of the vector of all unknowns.
+
+    Params:
+    -------
+    offset : int
+        Index of the room's first unknown in the vector of all unknowns.
+
+    shape : tuple
+        The shape (rows+2, cols+2) of the room's temperature matrix.
+
+    col : int
+        The column of the temperature matrix, negative values count from the
+        east wall.
+
+    first : int
+        The first row picked.
+
+    n : int
+        The number of rows picked.
+
+    size : int
+        The total number of unknowns.
+
+    Returns:
+    --------
+    selector : scipy.sparse.csr_matrix
+        Matrix with shape (n, size).
+
+    """
+    col = col % shape[1]
+    columns = offset + (first + np.arange(n))*shape[1] + col
+    return sp.csr_matrix((np.ones(n), (np.arange(n), columns)), shape=(n, size))
+
+
+def interface_placement(offset, shape, col, first, n, size, top, bottom):
+    """
+    Sparse matrix describing where construct_rhs_vector writes an interface
+    vector into a room's right hand side: -v[i] in rows first..first+n-1 of
+    column col, and -v[0]/-v[-1] added to the corners when the vector touches
+    the north/south wall.
+
+    Params:
+    -------
+    offset, shape, col, first, n, size :
+        As in column_selector.
+
+    top : bool
+        Whether v[0] is also added to the north corner of the column.
+
+    bottom : bool
+        Whether v[-1] is also added to the south corner of the column.
+
+    Returns:
+    --------
+    placement : scipy.sparse.csr_matrix
+        Matrix with shape (size, n).
+
+    """
+    col = col % shape[1]
+    rows = list(offset + (first + np.arange(n))*shape[1] + col)
+    entries = list(range(n))
+    if top:
+        rows.append(offset + col)
+        entries.append(0)
+    if bottom:
+        rows.append(offset + (shape[0] - 1)*shape[1] + col)
+        entries.append(n - 1)
+    return sp.csr_matrix((-np.ones(len(rows)), (rows, entries)), shape=(size, n))
+
+
+def apartment_rooms(heater, aircon, walls, cols, open = False, on_off = False):
+    """
+    Sets up the four rooms with sparse matrices and without a solver of their
+    own, in the order living room, kitchen, entryway, bathroom.
+
+    Params:
+    -------
+    heater, aircon, walls : float
+        The boundary temperatures, see problem_solver.Problem.
+
+    cols : int
+        The number of columns of interior gridpoints to be solved for.
+
+    open, on_off : bool
+        Whether the patio door is open and the oven is on.
+
+    Returns:
+    --------
+    rooms : list
+
+    """
+    return [room_livingroom.LivingRoom(heater, aircon, walls, cols, open, True, None),
+            room_kitchen.Kitchen(heater, aircon, walls, cols, open, on_off, True, None),
+            room_entryway.Entry(heater, aircon, walls, int(cols/2), True, None),
+            room_bathroom.BathRoom(aircon, walls, int(cols/2), True, None)]
+
+
+def boundary_rhs(rooms):
+    """
+    The right hand side of the coupled problem: every boundary temperature
+    that is not an interface, the interfaces are part of the matrix.
+
+    Params:
+    -------
+    rooms : list
+        The rooms returned by apartment_rooms.
+
+    Returns:
+    --------
+    b : ndarray
+
+    """
+    livingroom, kitchen, entryway, bathroom = rooms
+    cols, half = kitchen.cols, entryway.cols
+    return np.concatenate((
+        livingroom.construct_rhs_vector(np.zeros(half), np.zeros(cols)).copy(),
+        kitchen.construct_rhs_vector(np.zeros(cols)).copy(),
+        entryway.construct_rhs_vector(np.zeros(half), np.zeros(half)).copy(),
+        bathroom.construct_rhs_vector(np.zeros(half)).copy()))
+
+
+class MonolithicSolver:
+    """
+    Solves the whole apartment at once. The four rooms are put next to each
+    other the way plot_domain.Plotter.room_setup stitches them together, and
+    the interface conditions of the Dirichlet/Neumann iteration are written as
+    equations between the unknowns of neighbouring rooms:
+
+        living room west wall  = kitchen east column / entryway east column
+        kitchen east gradient  = (kitchen east column - living room west column)*dx
+        entryway east gradient = (entryway east column - living room west column)*dx
+        entryway west gradient = (bathroom east column - entryway west column)*dx
+        bathroom east wall     = entryway west column
+
+    The resulting sparse system is solved once, its solution is the fixed point
+    the iteration converges to and serves as reference for it.
+
+    Attributes:
+    -----------
+    rooms : list
+        The living room, kitchen, entryway and bathroom, set up with sparse
+        matrices and without a solver of their own.
+
+    offsets : list of int
+        Index of the first unknown of every room.
+
+    A : scipy.sparse.csr_matrix
+        The matrix of the coupled problem.
+
+    b : ndarray
+        The right hand side of the coupled problem.
+
+    Methods:
+    --------
+    assemble(self)
+        Builds A from the matrices of the rooms and the interface equations.
+
+    split(self, x)
+        Splits a solution of the coupled problem into the rooms.
+
+    solve(self)
+        Solves the coupled problem and splits the solution into the rooms.
+
+    """
+
+    def __init__(self, heater, aircon, walls, cols, open = False, on_off = False):
+        """
+
+        Params:
+        -------
+        heater, aircon, walls : float
+            The boundary temperatures, see problem_solver.Problem.
+
+        cols : int
+            The number of columns of interior gridpoints to be solved for.
+
+        open, on_off : bool
+            Whether the patio door is open and the oven is on.
+
+        """
+        self.cols = cols
+        self.rooms = apartment_rooms(heater, aircon, walls, cols, open, on_off)
+        self.shapes = [room.rhs_buffer.shape for room in self.rooms]
+        self.offsets = list(np.cumsum([0] + [rows*cols for rows, cols in self.shapes])[:-1])
+        self.A = self.assemble()
+        self.b = boundary_rhs(self.rooms)
+
+    def assemble(self):
+        """
+        Builds the matrix of the coupled system from the finite difference
+        matrix of every room and the interface equations. It only depends on
+        cols, not on any of the temperatures.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        A : scipy.sparse.csr_matrix
+            The matrix of the coupled problem.
+
+        """
+        livingroom, kitchen, entryway, bathroom = self.rooms
+        (oL, oK, oE, oB), (sL, sK, sE, sB) = self.offsets, self.shapes
+        size = sum(rows*cols for rows, cols in self.shapes)
+        cols, half = self.cols, int(self.cols/2)
+
+        #interface values as functions of the unknowns
+        kitchen_east = column_selector(oK, sK, -1, 1, cols, size)
+        entry_east = column_selector(oE, sE, -1, 1, half, size)
+        entry_west = column_selector(oE, sE, 0, 1, half, size)
+        living_upper = column_selector(oL, sL, 0, 1, half, size)
+        living_lower = column_selector(oL, sL, 0, cols+1, cols, size)
+        bath_upper = column_selector(oB, sB, -1, 1, half, size)
+
+        coupling = (interface_placement(oL, sL, 0, 1, half, size, True, False)*entry_east
+            + interface_placement(oL, sL, 0, cols+1, cols, size, False, True)*kitchen_east
+            + interface_placement(oK, sK, -1, 1, cols, size, True, True)*(kitchen_east - living_lower)*livingroom.dx
+            + interface_placement(oE, sE, 0, 1, half, size, True, True)*(bath_upper - entry_west)*bathroom.dx
+            + interface_placement(oE, sE, -1, 1, half, size, True, True)*(entry_east - living_upper)*livingroom.dx
+            + interface_placement(oB, sB, -1, 1, half, size, True, False)*entry_west)
+
+        A = sp.block_diag([room.behaviour_matrix for room in self.rooms], format='csr') - coupling
+        return A.tocsr()
+
+    def split(self, x):
+        """
+        Splits a solution of the coupled system into the rooms and removes the
+        exterior points.
+
+        Params:
+        -------
+        x : ndarray
+            Vector with all unknowns of the coupled problem.
+
+        Returns:
+        --------
+        om1, om2, om3, om4 : ndarray, ndarray, ndarray, ndarray
+            The interior temperatures of the living room, kitchen, entryway and
+            bathroom.
+
+        """
+        return tuple(x[offset:offset + shape[0]*shape[1]].reshape(shape)[1:-1,1:-1]
+                     for offset, shape in zip(self.offsets, self.shapes))
+
+    def solve(self):
+        """
+        Solves the coupled system with a sparse direct solver.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        om1, om2, om3, om4 : ndarray, ndarray, ndarray, ndarray
+            The interior temperatures of the living room, kitchen, entryway and
+            bathroom, as returned by the Dirichlet/Neumann iteration.
+
+        """
+        return self.split(spsolve(self.A.tocsc(), self.b))
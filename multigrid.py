@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+import matrix_creator, stencil_operator
+
+
+def prolongation_1d(n, left = False, right = False):
+    """
+    Linear interpolation from a coarse 1D grid onto a grid of n points. The
+    coarse points are the fine points with odd index, the fine points in
+    between take the mean of their two coarse neighbours. Past a Dirichlet edge
+    the correction is zero, at a Neumann edge the mirrored neighbour equals the
+    inner one, so the edge point takes its value.
+
+    Params:
+    -------
+    n : int
+        The number of fine gridpoints.
+
+    left, right : bool
+        Whether the left/right edge has a homogenous Neumann BC.
+
+    Returns:
+    --------
+    P : scipy.sparse.csr_matrix
+        Matrix with shape (n, n//2).
+
+    """
+    coarse = n//2
+    rows, columns, values = [], [], []
+    for j in range(coarse):
+        #coarse point j sits on fine point 2j+1 and reaches its two neighbours
+        rows += [2*j, 2*j + 1, 2*j + 2]
+        columns += [j, j, j]
+        values += [0.5, 1., 0.5]
+    P = sp.csr_matrix((values, (rows, columns)), shape=(n + 1, coarse))[:n].tolil()
+    if left:
+        P[0,0] = 1.
+    if right and n % 2:
+        P[n-1,coarse-1] = 1.
+    return P.tocsr()
+
+
+class MultigridSolver:
+    """
+    Geometric multigrid solver for a room. The grid is coarsened by a factor of
+    two in both directions with bilinear interpolation P and restriction P^T,
+    the coarse matrices are the Galerkin products P^T*A*P. Like the 'cg' solver
+    of stencil_operator.KrylovSolver it works on the symmetrized, positive
+    definite system -W*A*x = -W*b, so the Neumann edges need no special
+    treatment on the coarse grids. Damped Jacobi sweeps smooth the error on
+    every level and the coarsest level is solved directly.
+
+    Every call solves for the correction to the solution of the previous call,
+    performing V-cycles until the residual of the correction is small compared
+    to the residual the previous solution leaves, so small changes of the right
+    hand side during the Dirichlet/Neumann iteration are resolved as well as
+    large ones. With cycle='v' the correction starts from zero, with
+    cycle='fmg' a full multigrid cycle, which starts on the coarsest grid and
+    interpolates its solution upwards, provides it.
+
+    Attributes:
+    -----------
+    cycle : str
+        'v' or 'fmg'.
+
+    rtol : float
+        The iteration stops once the residual norm is below rtol times the norm
+        of the residual of the previous solution.
+
+    maxiter : int
+        Maximum number of V-cycles per call.
+
+    matrices : list of scipy.sparse.csr_matrix
+        The matrix of every level, finest first.
+
+    prolongations : list of scipy.sparse.csr_matrix
+        The interpolation from level k+1 to level k.
+
+    x0 : ndarray or None
+        The solution of the previous call.
+
+    iterations : int
+        The number of V-cycles used by the last call.
+
+    Methods:
+    --------
+    vcycle(self, level, b, x)
+        Improves the approximate solution x of level with one V-cycle.
+
+    fmg(self, b)
+        Full multigrid approximation of the solution.
+
+    solve(self, rhs)
+        Solves A*x = rhs.
+
+    """
+
+    def __init__(self, rows, cols, condition = '', cycle = 'v', rtol = 1e-10, maxiter = 100,
+                 smoothing = 2, omega = 0.8, coarsest = 400):
+        """
+
+        Params:
+        -------
+        rows, cols : int
+            The shape of the grid, as passed to FiniteDiffMatrix.
+
+        condition : string
+            The Neumann BCs, as passed to FiniteDiffMatrix.
+
+        cycle : str
+            'v' or 'fmg'.
+
+        rtol : float
+            Relative tolerance of the residual, relative to the residual of the
+            previous solution.
+
+        maxiter : int
+            Maximum number of V-cycles per call.
+
+        smoothing : int
+            The number of Jacobi sweeps before and after the coarse grid
+            correction.
+
+        omega : float
+            The damping factor of the Jacobi sweeps.
+
+        coarsest : int
+            Levels with at most this many unknowns are solved directly.
+
+        """
+        if cycle not in ('v', 'fmg'):
+            raise ValueError("unknown multigrid cycle {!r}, expected 'v' or 'fmg'".format(cycle))
+        condition = condition or ''
+        self.rows = rows
+        self.cols = cols
+        self.cycle = cycle
+        self.rtol = rtol
+        self.maxiter = maxiter
+        self.smoothing = smoothing
+        self.omega = omega
+        self.x0 = None
+        self.iterations = 0
+        self.weights = np.tile(stencil_operator.neumann_weights(cols, condition), rows)
+
+        A = matrix_creator.FiniteDiffMatrix(rows, cols, condition, sparse=True).A
+        self.matrices = [(-sp.diags(self.weights)*A).tocsr()]
+        self.prolongations = []
+        while rows*cols > coarsest and min(rows, cols) >= 4:
+            P = sp.kron(prolongation_1d(rows), prolongation_1d(cols, 'l' in condition, 'r' in condition),
+                        format='csr')
+            self.prolongations.append(P)
+            self.matrices.append((P.T*self.matrices[-1]*P).tocsr())
+            rows, cols = rows//2, cols//2
+        self.inverse_diagonals = [self.omega/A.diagonal() for A in self.matrices]
+        self.coarse_solver = splu(self.matrices[-1].tocsc())
+
+    def smooth(self, level, b, x):
+        A, dinv = self.matrices[level], self.inverse_diagonals[level]
+        for sweep in range(self.smoothing):
+            x += dinv*(b - A*x)
+        return x
+
+    def vcycle(self, level, b, x):
+        """
+        Params:
+        -------
+        level : int
+            The level, 0 is the finest grid.
+
+        b : ndarray
+            The right hand side on that level.
+
+        x : ndarray
+            The approximate solution, updated in place.
+
+        Returns:
+        --------
+        x : ndarray
+            The improved solution.
+
+        """
+        if level == len(self.prolongations):
+            x[:] = self.coarse_solver.solve(b)
+            return x
+        P = self.prolongations[level]
+        x = self.smooth(level, b, x)
+        residual = b - self.matrices[level]*x
+        coarse = P.T*residual
+        x += P*self.vcycle(level + 1, coarse, np.zeros_like(coarse))
+        return self.smooth(level, b, x)
+
+    def fmg(self, b):
+        """
+        Restricts b to every level, solves on the coarsest and interpolates the
+        solution level by level, improving it with one V-cycle on each.
+
+        Params:
+        -------
+        b : ndarray
+            The right hand side on the finest level.
+
+        Returns:
+        --------
+        x : ndarray
+            The approximate solution on the finest level.
+
+        """
+        rhs = [b]
+        for P in self.prolongations:
+            rhs.append(P.T*rhs[-1])
+        x = self.coarse_solver.solve(rhs[-1])
+        for level in reversed(range(len(self.prolongations))):
+            x = self.vcycle(level, rhs[level], self.prolongations[level]*x)
+        return x
+
+    def solve(self, rhs):
+        """
+        Params:
+        -------
+        rhs : ndarray
+            The right hand side vector of length rows*cols.
+
+        Returns:
+        --------
+        x : ndarray
+            The solution of A*x = rhs.
+
+        """
+        b = -self.weights*rhs
+        A = self.matrices[0]
+        x0 = np.zeros_like(b) if self.x0 is None else self.x0
+        residual = b - A*x0
+        self.iterations = 0
+        if not np.any(residual):
+            #the previous solution solves the system exactly
+            return x0
+        if self.cycle == 'fmg':
+            dx = self.fmg(residual)
+            self.iterations = 1
+        else:
+            dx = np.zeros_like(b)
+        bound = self.rtol*np.linalg.norm(residual)
+        while np.linalg.norm(residual - A*dx) > bound:
+            if self.iterations >= self.maxiter:
+                raise RuntimeError('multigrid did not converge to rtol={} in {} cycles'.format(
+                    self.rtol, self.maxiter))
+            dx = self.vcycle(0, residual, dx)
+            self.iterations += 1
+        self.x0 = x0 + dx
+        return self.x0
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+import copy
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sp
+import matrix_creator
+
+
+def nbytes(obj):
+    """
+    Estimates the memory held by a matrix or a solver: the arrays, sparse
+    matrices and sparse factorizations it references.
+
+    Params:
+    -------
+    obj : object
+        An ndarray, scipy.sparse matrix, SuperLU factorization, a tuple or list
+        of them or one of the solver objects of matrix_creator.make_solver.
+
+    Returns:
+    --------
+    size : int
+        The estimated number of bytes.
+
+    """
+    if obj is None:
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if sp.issparse(obj):
+        return sum(getattr(obj, name).nbytes for name in ('data', 'indices', 'indptr', 'row', 'col', 'offsets')
+                   if hasattr(obj, name))
+    if hasattr(obj, 'perm_r'):
+        #SuperLU, values and row indices of L and U
+        return obj.nnz*12
+    if isinstance(obj, (tuple, list)):
+        return sum(nbytes(item) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return sum(nbytes(value) for value in vars(obj).values()
+                   if isinstance(value, (np.ndarray, tuple, list)) or sp.issparse(value) or hasattr(value, 'perm_r'))
+    return 0
+
+
+class OperatorCache:
+    """
+    Process-wide cache of the finite difference matrices and linear solvers of
+    the rooms, keyed by shape, Neumann pattern, storage format and solver. A
+    room of the same shape created again, by a later run at the same
+    resolution, skips assembly and factorization. The least recently used
+    entries are dropped once the cached operators exceed the memory budget.
+
+    With a directory the assembled matrices and dense LU factors are also
+    written to disk as .npy (dense, loaded memory-mapped) or .npz (sparse)
+    files, so later processes skip the work as well. This does not hold for
+    sparse LU: scipy cannot rebuild a SuperLU object from its L, U, perm_r and
+    perm_c, and the alternatives do not pay off. Solving with the stored
+    factors through spsolve_triangular is about ten times slower per solve,
+    more than a factorization over a run, and wrapping them in new SuperLU
+    objects costs as much as factorizing (0.9 s against 1.1 s at 400x400).
+    For sparse LU only the matrix is stored, and loading it repeats the
+    factorization; these loads are counted as disk_refactorizations, not as
+    disk_hits.
+
+    Solvers that keep state between solves, like the previous solution used as
+    starting guess by the iterative ones, are handed out as shallow copies so
+    that rooms never share that state.
+
+    Attributes:
+    -----------
+    max_bytes : int
+        The memory budget of the cached operators.
+
+    directory : str or None
+        Where operators are persisted, None keeps them in memory only.
+
+    entries : OrderedDict
+        The cached (matrix, solver, size) triples, least recently used first.
+
+    hits, misses, disk_hits, disk_refactorizations, disk_writes, evictions : int
+        Counters, see stats.
+
+    Methods:
+    --------
+    get(self, rows, cols, condition, sparse, solver)
+        The matrix and solver of a room, from the cache if possible.
+
+    stats(self)
+        The cache statistics as a dict.
+
+    clear(self)
+        Empties the cache and resets the statistics.
+
+    """
+
+    def __init__(self, max_bytes = 512*2**20, directory = None):
+        """
+
+        Params:
+        -------
+        max_bytes : int
+            The memory budget of the cached operators.
+
+        directory : str
+            Directory for the on-disk store, created if needed.
+
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.clear()
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.disk_hits = self.disk_refactorizations = 0
+        self.disk_writes = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+        --------
+        stats : dict
+            The number of hits, misses (of which disk_hits were loaded from
+            disk complete with their factorization, and disk_refactorizations
+            were sparse LU solvers whose matrix was loaded and factorized
+            again), disk_writes and evictions, and the number of entries and
+            bytes currently cached.
+
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits,
+                'disk_refactorizations': self.disk_refactorizations,
+                'disk_writes': self.disk_writes, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.size}
+
+    def get(self, rows, cols, condition = '', sparse = False, solver = 'lu'):
+        """
+        Params:
+        -------
+        rows, cols, condition, sparse :
+            As passed to matrix_creator.FiniteDiffMatrix.
+
+        solver : str or None
+            As passed to matrix_creator.make_solver.
+
+        Returns:
+        --------
+        A : ndarray, scipy.sparse.csr_matrix or None
+            The finite difference matrix, None if solver does not need it.
+            Shared between rooms, it must not be modified.
+
+        linear_solver : object
+            The solver returned by matrix_creator.make_solver.
+
+        """
+        key = (rows, cols, condition or '', bool(sparse), solver)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            A, linear_solver, size = self.entries[key]
+            return A, copy.copy(linear_solver)
+        self.misses += 1
+        loaded = self.load(key)
+        if loaded is None:
+            finite_diff = matrix_creator.FiniteDiffMatrix(rows, cols, condition, sparse,
+                                                          matrix_creator.needs_matrix(solver))
+            A, linear_solver = finite_diff.A, matrix_creator.make_solver(finite_diff, solver)
+            self.save(key, A, linear_solver)
+        else:
+            A, linear_solver, refactorized = loaded
+            if refactorized:
+                self.disk_refactorizations += 1
+            else:
+                self.disk_hits += 1
+        self.insert(key, A, linear_solver)
+        return A, copy.copy(linear_solver)
+
+    def insert(self, key, A, linear_solver):
+        size = nbytes(A) + nbytes(linear_solver)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (A, linear_solver, size)
+        self.size += size
+        self.evict()
+
+    def evict(self):
+        while self.entries and self.size > self.max_bytes:
+            self.size -= self.entries.popitem(last=False)[1][2]
+            self.evictions += 1
+
+    def path(self, key, name):
+        rows, cols, condition, sparse, solver = key
+        return os.path.join(self.directory, 'fd_{}x{}_{}_{}_{}.{}'.format(
+            rows, cols, condition or 'd', 'sparse' if sparse else 'dense', solver, name))
+
+    def write(self, key, name, save, data):
+        #written to a temporary file first so other processes never read half a file
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as f:
+            save(f, data)
+        os.replace(temporary, self.path(key, name))
+
+    def save(self, key, A, linear_solver):
+        if self.directory is None or A is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if sp.issparse(A):
+            self.write(key, 'A.npz', sp.save_npz, A)
+        else:
+            self.write(key, 'A.npy', np.save, A)
+        if isinstance(linear_solver, matrix_creator.FactorizedMatrix) and not linear_solver.sparse:
+            self.write(key, 'piv.npy', np.save, linear_solver.lu[1])
+            self.write(key, 'lu.npy', np.save, linear_solver.lu[0])
+        self.disk_writes += 1
+
+    def load(self, key):
+        sparse, solver = key[3], key[4]
+        if self.directory is None or solver not in ('lu', None):
+            return None
+        try:
+            if sparse:
+                A = sp.load_npz(self.path(key, 'A.npz')).tocsr()
+            else:
+                A = np.load(self.path(key, 'A.npy'), mmap_mode='r')
+            if solver is None:
+                return A, None, False
+            if sparse:
+                #only the matrix is stored, see the class docstring
+                return A, matrix_creator.FactorizedMatrix(A), True
+            lu = (np.load(self.path(key, 'lu.npy'), mmap_mode='r'), np.load(self.path(key, 'piv.npy')))
+        except FileNotFoundError:
+            return None
+        return A, matrix_creator.FactorizedMatrix(A, lu), False
+
+
+#the cache shared by every room of this process
+CACHE = OperatorCache()
+
+
+def configure(max_bytes = None, directory = None):
+    """
+    Changes the memory budget and the on-disk store of the process-wide cache.
+
+    Params:
+    -------
+    max_bytes : int
+        The new memory budget, entries beyond it are evicted immediately.
+
+    directory : str
+        Directory for the on-disk store.
+
+    Returns:
+    --------
+    cache : OperatorCache
+        The process-wide cache.
+
+    """
+    if max_bytes is not None:
+        CACHE.max_bytes = max_bytes
+        CACHE.evict()
+    if directory is not None:
+        CACHE.directory = directory
+    return CACHE
+
+
+def room_operator(rows, cols, condition = '', sparse = False, solver = 'lu'):
+    """
+    The finite difference matrix and linear solver of a room from the
+    process-wide cache, see OperatorCache.get.
+    """
+    return CACHE.get(rows, cols, condition, sparse, solver)
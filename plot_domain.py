@@ -5,10 +5,112 @@
 # @Last modified by:   thomas
 # @Last modified time: 2020-09-01T13:48:46+02:00
 
-import matplotlib.pyplot as plt
-from matplotlib import *
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
+#colormap lookup tables by name and size, see colormap_lut
+LUTS = {}
+
+
+def colormap_lut(name = 'inferno', size = 256):
+    """
+    The colors of a matplotlib colormap sampled once, so that rendering a field
+    is a single lookup per pixel.
+
+    Params:
+    -------
+    name : str
+        The name of the colormap.
+
+    size : int
+        The number of colors.
+
+    Returns:
+    --------
+    lut : ndarray
+        uint8 array with shape (size, 3) of RGB colors.
+
+    """
+    if (name, size) not in LUTS:
+        #only the colormaps are needed, not pyplot and its backends
+        import matplotlib
+        colors = matplotlib.colormaps[name](np.linspace(0, 1, size))[:,:3]
+        LUTS[name, size] = np.round(255*colors).astype(np.uint8)
+    return LUTS[name, size]
+
+
+def write_png(path, rgb):
+    """
+    Writes an RGB image as an 8 bit PNG file without any imaging library.
+
+    Params:
+    -------
+    path : str
+        The file written.
+
+    rgb : ndarray
+        uint8 array with shape (height, width, 3), row 0 at the top.
+
+    Returns:
+    --------
+    None
+
+    """
+    height, width = rgb.shape[:2]
+    #every row starts with filter type 0, the pixels are stored as they are
+    rows = np.zeros((height, 1 + 3*width), dtype=np.uint8)
+    rows[:,1:] = rgb.reshape(height, 3*width)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def render_file(field, path, **options):
+    """
+    Renders an apartment stored in a .npy file (see field_output), used by
+    render_many so that the workers read the fields themselves.
+    """
+    Plotter.from_field(np.load(field, mmap_mode='r')).render(path, **options)
+
+
+def render_many(fields, paths, jobs = None, **options):
+    """
+    Renders many apartments in a pool of processes.
+
+    Params:
+    -------
+    fields : list of str
+        The .npy files of the apartments, e.g. written by Problem with output.
+
+    paths : list of str
+        The PNG file of every apartment.
+
+    jobs : int
+        The number of processes, by default one per core.
+
+    options :
+        Passed on to Plotter.render, e.g. vmin and vmax to give all images
+        the same colors.
+
+    Returns:
+    --------
+    None
+
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(render_file, field, path, **options) for field, path in zip(fields, paths)]
+        #raises the error of a failed image
+        for future in futures:
+            future.result()
+
+
 class Plotter(object):
     """
     Takes the computed temperature solution matrices. Flips the individual
@@ -31,10 +133,16 @@ class Plotter(object):
     room_setup(self, om1, om2, om3, om4,temp)
         Stacks, pads and flips all of the different matrices into one.
 
+    from_field(cls, room)
+        Creates a Plotter for an apartment that is already stitched together.
 
-    room_image(self,resolution,input1, input2)
+
+    room_image(self,resolution,input1, input2, path)
         Plots the room and saves the image.
 
+    render(self, path, vmin, vmax, cmap, scale, contours)
+        Saves the room as a PNG image without creating a figure.
+
 
 
     """
@@ -65,6 +173,26 @@ class Plotter(object):
         """
         self.room = self.room_setup(om1, om2, om3, om4,temp)
 
+    @classmethod
+    def from_field(cls, room):
+        """
+        Uses an apartment stitched together elsewhere, e.g. the memory-mapped
+        file of field_output, without copying it.
+
+        Params:
+        -------
+        room : ndarray
+            The apartment with shape (2*cols, 2*cols).
+
+        Returns:
+        --------
+        plotter : Plotter
+
+        """
+        plotter = cls.__new__(cls)
+        plotter.room = room
+        return plotter
+
     def room_setup(self, om1, om2, om3, om4,temp):
         """
         Takes the computed temperature solution matrices. Flips the individual
@@ -102,7 +230,7 @@ class Plotter(object):
         apartment = np.flip(apartment, 0)
         return apartment
 
-    def room_image(self,resolution,input1, input2):
+    def room_image(self,resolution,input1, input2, path = None):
         """
         Creates and saves a filled contour plot of the domain. The resolution is
         determined by the maximum temperature input. The suffix of the image is
@@ -120,12 +248,70 @@ class Plotter(object):
         input2 : str
             The boolean that tells if the oven is on or off.
 
+        path : str
+            Where the image is saved, by default Temperature_<input1>_<input2>.png
+            in the working directory.
+
         Returns:
         --------
         None
         """
+        #imported here so that using the solver does not load matplotlib
+        import matplotlib.pyplot as plt
         suffix = str(input1)+'_'+str(input2) #force everything to be a string for concatenatation
         fig, ax2 = plt.subplots()
         CS = plt.contourf(self.room,resolution,cmap = plt.cm.inferno)
         Cbar = fig.colorbar(CS)
-        plt.savefig('Temperature_' + suffix +'.png')
+        plt.savefig(path if path is not None else 'Temperature_' + suffix +'.png')
+        #pyplot keeps every figure alive until it is closed
+        plt.close(fig)
+
+    def render(self, path, vmin = None, vmax = None, cmap = 'inferno', scale = 8, contours = None):
+        """
+        Saves the room as a PNG image, one block of scale x scale pixels per
+        gridpoint colored through a lookup table. Nothing of matplotlib but
+        the colormap is used, so many images can be written quickly, also in
+        parallel (see render_many). There is no colorbar.
+
+        Params:
+        -------
+        path : str
+            The PNG file written.
+
+        vmin, vmax : float
+            The temperatures at the ends of the colormap, by default the
+            lowest and highest temperature of the room. Give the same values
+            to compare several images.
+
+        cmap : str
+            The name of the matplotlib colormap.
+
+        scale : int
+            The size in pixels of every gridpoint.
+
+        contours : int
+            If given, isotherms at this many evenly spaced temperatures
+            between vmin and vmax are drawn in white.
+
+        Returns:
+        --------
+        None
+
+        """
+        lut = colormap_lut(cmap)
+        #the room is stored bottom row first, the image starts at the top
+        room = np.asarray(self.room, dtype=float)[::-1]
+        vmin = room.min() if vmin is None else vmin
+        vmax = room.max() if vmax is None else vmax
+        span = vmax - vmin if vmax > vmin else 1.0
+        room = np.repeat(np.repeat(room, scale, axis=0), scale, axis=1)
+        index = np.clip((room - vmin)/span*(len(lut) - 1) + 0.5, 0, len(lut) - 1).astype(np.intp)
+        rgb = lut[index]
+        if contours:
+            #pixels whose band differs from the one right of or below them
+            band = np.floor((room - vmin)/span*(contours + 1)).astype(np.intp)
+            edge = np.zeros(band.shape, dtype=bool)
+            edge[:,:-1] |= band[:,:-1] != band[:,1:]
+            edge[:-1,:] |= band[:-1,:] != band[1:,:]
+            rgb[edge] = 255
+        write_png(path, rgb)
@@ -7,34 +7,121 @@
 
 
 
-from mpi4py import MPI
 import numpy as np
 import room_kitchen, room_bathroom, room_livingroom, room_entryway, plot_domain
+import relaxation, interface_exchange, scheduler, monolithic_solver, field_output, checkpointing
+import initial_guess, instrumentation
+from scheduler import COLLECTOR, LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM
+
+def interface_change(current, previous):
+    """
+    Measures how much the interface data exchanged by a process changed
+    between two successive sweeps.
+
+    Params:
+    -------
+    current : ndarray or None
+        The interface data of the current sweep, None on processes that do not
+        own a room.
+
+    previous : ndarray or None
+        The interface data of the previous sweep, None on the first sweep.
+
+    Returns:
+    --------
+    change : float
+        The largest absolute change, inf on the first sweep.
+    """
+    if current is None:
+        return 0.0
+    if previous is None:
+        return np.inf
+    return float(np.max(np.abs(current - previous)))
+
+
+def room_solver(solver, room):
+    """
+    The linear solver of one room.
+
+    Params:
+    -------
+    solver : str or dict
+        One solver for every room, or a dict mapping room numbers (see
+        scheduler) to solvers. Rooms missing from the dict use 'lu'.
+
+    room : int
+        The room number.
+
+    Returns:
+    --------
+    solver : str
+    """
+    if isinstance(solver, dict):
+        return solver.get(room, 'lu')
+    return solver
+
 
 class Solver:
     """
-    Performs parallel computation of the 2D-Heat Equation on five processes.
-    Implements blocking communication from MPI4py to generate solutions by
-    iteratively prescribing Dirichlet and Neumann boundary conditions.
+    Performs parallel computation of the 2D-Heat Equation on any number of
+    processes. The rooms are distributed over the processes by a
+    scheduler.RoomScheduler and communicate through MPI4py to generate
+    solutions by iteratively prescribing Dirichlet and Neumann boundary
+    conditions.
 
     Attributes:
     ----------
-    None
+    interfaces : dict or None
+        The interface temperatures 'kitchen', 'entry_east' and 'entry_west'
+        the last iteration ended with, on process 0. Used for warm starts, see
+        initial_guess.
+
+    solution : tuple
+        (om1, om2, om3, om4, iterations, residuals) of the last run of
+        dirichlet_neumann_sweeps, see dirichelt_neumann_iteration.
+
+    profile : instrumentation.Report or None
+        The timings and message sizes of every process in the last run, on
+        process 0 of a profiled run.
 ``
     Methods:
     -------
-    dirichelt_neumann_iteration(self, heater, aircon, cols, iters, open, on_off)
+    dirichlet_neumann_sweeps(self, heater, aircon, walls, cols, iters, open, on_off, sparse, tol, relax, theta, comm_mode, engine, solver, output, checkpoint, checkpoint_every, resume, warm_start, profile, fields)
+        Generator performing the Dirichlet/Neumann iteration one sweep at a time
+
+    dirichelt_neumann_iteration(self, heater, aircon, walls, cols, iters, open, on_off, sparse, tol, relax, theta, comm_mode, engine, solver, output, checkpoint, checkpoint_every, resume, warm_start, profile)
         Implements Dirichlet/Neumann iteration to solve the 2D-Heat Equation
 
     """
-    def dirichelt_neumann_iteration(self, heater, aircon, walls, cols, iters, open, on_off):
+    def dirichlet_neumann_sweeps(self, heater, aircon, walls, cols, iters, open, on_off, sparse = False, tol = None,
+                                 relax = 'fixed', theta = 0.8, comm_mode = 'buffer', engine = 'mpi',
+                                 solver = 'lu', output = None, checkpoint = None, checkpoint_every = 10,
+                                 resume = False, warm_start = None, profile = False, fields = None):
         """
         Solves the 2D-Heat Equation iteratively perscribing Dirichlet and
-        Neumann boundary conditions to the different domains.
-
-        Uses five processes (0-4) to produce a convergent solution.
-
-
+        Neumann boundary conditions to the different domains, yielding a
+        small record after every sweep so that the iteration can be monitored
+        while it runs.
+
+        Works with any number of processes, process 0 solves rooms as well as
+        collecting the final solution. Each sweep first solves the Dirichlet
+        rooms (living room and bathroom) with the interface temperatures of the
+        previous sweep, then the Neumann rooms (kitchen and entryway) with the
+        new gradients, whose interface temperatures are received before the
+        sweep ends.
+
+        After every sweep each process measures the change of the interface
+        data it produced: the Neumann temperatures of the kitchen and entryway
+        and the gradients of the living room and bathroom (divided by dx so
+        that every residual is a temperature). The largest change over all
+        processes is agreed on with an allreduce so that every process stops
+        on the same sweep.
+
+        The loop can be left early by closing the generator, e.g. by breaking
+        out of a for loop over it. The rooms are then collected as if the
+        iteration had ended there, so every process has to stop after the
+        same sweep, for instance by looking at the residual of the records,
+        which is the same on all of them.
 
         Params:
         -------
@@ -50,6 +137,9 @@ class Solver:
         cols : int
             The number of columns of interior gridpoints to be solved for.
 
+        iters : int
+            The maximum number of iterations to perform.
+
         open : bool
             Boolean value passed into the problem determin whether or not the patio
             door is open(True) or closed(False) as default.
@@ -59,118 +149,402 @@ class Solver:
             acting as a source of heat or a source of cold due to constant vaccum
             being applied at that location.
 
-        Returns:
+        sparse : bool
+            Assemble and solve every room with scipy.sparse matrices instead of
+            dense arrays, needed for large values of cols.
+
+        tol : float
+            If given the iteration stops as soon as the interface residual drops
+            below tol, otherwise exactly iters iterations are performed.
+
+        relax : str
+            The relaxation applied to the interface temperatures sent back by
+            the kitchen and entryway, 'fixed', 'aitken' or 'iqn-ils'.
+
+        theta : float
+            The fixed relaxation factor, or the initial one for 'aitken' and
+            'iqn-ils'.
+
+        comm_mode : str
+            How the interface data is communicated: 'pickle' for the lowercase
+            send/recv, 'buffer' for Send/Recv into preallocated numpy buffers
+            or 'nonblocking' for Isend/Irecv.
+
+        engine : str
+            'mpi' distributes the rooms over the processes of MPI.COMM_WORLD,
+            'serial' solves all of them in this process without mpi4py.
+
+        solver : str or dict
+            The linear solver of every room: 'lu' for a factorization computed
+            once, 'cg' or 'gmres' for a matrix-free preconditioned Krylov
+            method, 'multigrid' or 'fmg' for geometric multigrid, 'fft' for
+            the fast sine/cosine transform Poisson solver. A dict keyed
+            by room number selects the solver per room, e.g.
+            {LIVINGROOM: 'multigrid', KITCHEN: 'fmg'}.
+
+        output : str
+            If given, every process writes its rooms directly into this
+            memory-mapped .npy file holding the stitched apartment (see
+            field_output) instead of sending them to process 0. Needs an even
+            cols and a file system shared by all processes.
+
+        checkpoint : str
+            Directory the state of the iteration is written to every
+            checkpoint_every iterations, by every process for the rooms it owns
+            (see checkpointing). Written in the background while the sweeps
+            continue. Unless resuming, the checkpoints already in the
+            directory are removed first.
+
+        checkpoint_every : int
+            The number of iterations between two checkpoints, at least 1.
+
+        resume : bool
+            Continue from the last iteration with a checkpoint of every room in
+            the checkpoint directory instead of starting from the initial
+            guesses. Raises a ValueError if there is none, if it was written
+            for other temperatures, cols, open, on_off, relax, theta or solver,
+            or if its iteration is beyond iters. The number of processes may
+            differ from the run that wrote it.
+
+        warm_start : Problem, tuple or initial_guess.InitialGuess
+            A previous result whose room temperatures, interpolated if it was
+            computed for a different cols, replace the initial guesses of the
+            interface temperatures and the starting guesses of iterative
+            room solvers. Only needed on process 0.
+
+        profile : bool
+            Time every phase of the iteration on every process and count the
+            bytes of every message, the report is stored in self.profile on
+            process 0 (see instrumentation). Without it the rooms and the
+            communication are not wrapped at all.
+
+        fields : str
+            None to leave the room temperatures out of the records, 'view' to
+            include views of them, 'copy' to include copies. The views stay
+            valid after the next sweep since every solve replaces the room's
+            temperature matrix instead of overwriting it.
+
+        Yields:
         -------
-        om1, om2, om3, om4 : ndarray, ndarray, ndarray, ndarray
-            Matrices containing the computed heat values.
+        record : dict
+            'iteration', the number of iterations performed, 'residual', the
+            interface residual of the sweep agreed on by all processes, and
+            'residuals', the change of the interface data of each room of
+            this process keyed by room number. With fields also 'rooms', the
+            interior temperatures of the rooms of this process keyed by room
+            number.
+
+        Setting record['stop'] = True ends the iteration after that sweep,
+        the rooms are then collected as if tol had been reached. Under MPI
+        every process has to stop after the same sweep, e.g. by deciding on
+        the agreed 'residual'. Once the generator is exhausted self.solution
+        holds (om1, om2, om3, om4, iterations, residuals) as returned by
+        dirichelt_neumann_iteration.
+
+        Closing the generator early, by leaving the loop over it or through
+        an exception or garbage collection, possibly on one process only,
+        makes no collective calls and collects nothing: self.solution is left
+        as it was.
         """
 
-        comm = MPI.COMM_WORLD
+        if fields not in (None, 'view', 'copy'):
+            raise ValueError("unknown fields {!r}, expected None, 'view' or 'copy'".format(fields))
+        if engine == 'serial':
+            comm, max_op, min_op = interface_exchange.SerialComm(), None, None
+        elif engine == 'mpi':
+            from mpi4py import MPI
+            comm, max_op, min_op = MPI.COMM_WORLD, MPI.MAX, MPI.MIN
+        else:
+            raise ValueError("unknown engine {!r}, expected 'mpi' or 'serial'".format(engine))
+        if output is not None and cols % 2:
+            raise ValueError('the apartment file needs an even number of columns, got {}'.format(cols))
+        if resume and checkpoint is None:
+            raise ValueError('resume needs the checkpoint directory to resume from')
+        if checkpoint is not None and checkpoint_every < 1:
+            raise ValueError('checkpoint_every has to be at least 1, got {}'.format(checkpoint_every))
         rank = comm.Get_rank()
-        nprocessors = comm.Get_size()
         iterations = iters
-
-
-        livingroom = room_livingroom.LivingRoom(heater, aircon, walls, cols, open)
-        kitchen = room_kitchen.Kitchen(heater, aircon, walls, cols, open, on_off)
-        entryway = room_entryway.Entry(heater, aircon, walls, int(cols/2))
-        bathroom = room_bathroom.BathRoom(aircon, walls, int(cols/2))
+        schedule = scheduler.RoomScheduler(comm.Get_size(), cols)
+        rooms = schedule.rooms_of(rank)
+        probe = instrumentation.Probe(rank) if profile else instrumentation.NULL_PROBE
+        exchange = probe.instrument_exchange(interface_exchange.make_exchange(comm, cols, comm_mode, schedule))
+
+        with probe.phase('assembly'):
+            #every process only sets up the rooms it owns
+            owned = {}
+            if LIVINGROOM in rooms:
+                livingroom = owned[LIVINGROOM] = room_livingroom.LivingRoom(heater, aircon, walls, cols, open, sparse, room_solver(solver, LIVINGROOM))
+                btemp3, btemp2 = livingroom.twestt, livingroom.twestb
+
+            if KITCHEN in rooms:
+                kitchen = owned[KITCHEN] = room_kitchen.Kitchen(heater, aircon, walls, cols, open, on_off, sparse, room_solver(solver, KITCHEN))
+                #interface temperatures of the initial solve, relaxed against at the first sweep
+                data2_out = kitchen.get_neumann_temps()
+                kitchen_relaxation = relaxation.make_relaxation(relax, theta)
+
+            if ENTRYWAY in rooms:
+                entryway = owned[ENTRYWAY] = room_entryway.Entry(heater, aircon, walls, int(cols/2), sparse, room_solver(solver, ENTRYWAY))
+                data3_out = np.concatenate(entryway.get_neumann_temps())
+                entryway_relaxation = relaxation.make_relaxation(relax, theta)
+
+            if BATHROOM in rooms:
+                bathroom = owned[BATHROOM] = room_bathroom.BathRoom(aircon, walls, int(cols/2), sparse, room_solver(solver, BATHROOM))
+                btemp4 = bathroom.teastt
+        for room in owned.values():
+            probe.instrument_room(room)
+
+        #the other processes may not have the previous result
+        if comm.allreduce(warm_start is not None, op=max_op):
+            guess = comm.bcast(initial_guess.make_initial_guess(warm_start, cols) if rank == 0 else None, root=0)
+            if LIVINGROOM in rooms:
+                btemp3, btemp2 = guess.entry_east, guess.kitchen
+                guess.seed(livingroom, LIVINGROOM)
+            if KITCHEN in rooms:
+                data2_out = guess.kitchen
+                guess.seed(kitchen, KITCHEN)
+            if ENTRYWAY in rooms:
+                data3_out = np.concatenate((guess.entry_east, guess.entry_west))
+                guess.seed(entryway, ENTRYWAY)
+            if BATHROOM in rooms:
+                btemp4 = guess.entry_west
+                guess.seed(bathroom, BATHROOM)
 
         i = 0
-
-        while i != iterations:
-            if i == 0:
-                if rank == 1:
-                    g_13, g_12 = livingroom.temp_gradient_calc(livingroom.twestt,livingroom.twestb)
-                    comm.send(g_12, dest=2, tag=12)
-                    comm.send(g_13, dest=3, tag=13)
-
-                if rank == 4:
-                    g_43 = bathroom.temp_gradient_calc(bathroom.teastt)
-                    comm.send(g_43, dest=3, tag=43)
-
-                if rank == 2:
-                    temp2_old = kitchen.temperature_matrix #needed to relax temperature calculations
-                    data2_in = comm.recv(source=1, tag=12)
-                    kitchen.get_temperature_matrix(data2_in)
-                    #relaxation step necessary for producing convergent solution.
-                    kitchen.temperature_matrix = (0.8)*kitchen.temperature_matrix + (0.2)*temp2_old
-                    data2_out = kitchen.get_neumann_temps()
-                    comm.send(data2_out, dest=1, tag=21)
-
-                if rank == 3:
-                    temp3_old = entryway.temperature_matrix #needed to relax temperature calculations
-                    data31_in = comm.recv(source=1, tag=13)
-                    data34_in = comm.recv(source=4, tag=43)
-                    entryway.get_temperature_matrix(data34_in, data31_in)
-                    #relaxation step necessary for producing convergent solution.
-                    entryway.temperature_matrix = (0.8)*entryway.temperature_matrix + (0.2)*temp3_old
-                    data31_out, data34_out = entryway.get_neumann_temps()
-                    comm.send(data31_out, dest=1, tag=31)
-                    comm.send(data34_out, dest=4, tag=34)
-
-                i +=1
-            else:
-                if rank == 1:
-                    btemp2 = comm.recv(source=2, tag=21)
-                    btemp3 = comm.recv(source=3, tag=31)
+        residuals = []
+        previous = {} #interface data produced by each room of this process in the last sweep
+
+        writer = None
+        if checkpoint is not None:
+            #the settings that change the iterates, a resumed run has to have the same
+            scenario = {'heater': heater, 'aircon': aircon, 'walls': walls, 'cols': cols, 'open': open,
+                        'on_off': on_off, 'relax': relax, 'theta': theta, 'solver': solver}
+            writer = checkpointing.CheckpointWriter(checkpoint, scenario=scenario)
+            if not resume:
+                #a new run starts its own checkpoints, older ones would be taken for its latest
+                if rank == 0:
+                    checkpointing.clear(checkpoint)
+                comm.Barrier()
+        if resume:
+            #all processes have to restart from the same iteration
+            latest = checkpointing.latest(checkpoint)
+            i = comm.allreduce(-1 if latest is None else latest, op=min_op)
+            if i < 0:
+                raise ValueError('there is no complete checkpoint to resume from in {}'.format(checkpoint))
+            if i > iters:
+                raise ValueError('the checkpoint in {} is of iteration {}, resuming from it needs iters >= {}, '
+                                 'got {}'.format(checkpoint, i, i, iters))
+            #every process checks the checkpoints of its rooms, all of them stop if one differs
+            same = all(checkpointing.same_scenario(checkpoint, room, i, scenario) for room in rooms)
+            if not comm.allreduce(same, op=min_op):
+                raise ValueError('the checkpoints in {} were written for a different scenario, {} is '
+                                 'expected'.format(checkpoint, checkpointing.describe(scenario)))
+            for room in rooms:
+                writer.adopt(room, sorted(iteration for iteration in checkpointing.available(checkpoint)[room]
+                                          if iteration <= i))
+            #the residuals are stored with the living room, process 0 reads them for everyone
+            if rank == 0:
+                residuals = list(checkpointing.load(checkpoint, LIVINGROOM, i, ['residuals'])['residuals'])
+            residuals = comm.bcast(residuals, root=0)
+            if LIVINGROOM in rooms:
+                state = checkpointing.load(checkpoint, LIVINGROOM, i)
+                livingroom.temperature_matrix = state['temperature_matrix']
+                btemp2, btemp3 = state['btemp2'], state['btemp3']
+                previous[LIVINGROOM] = state['previous']
+            if KITCHEN in rooms:
+                state = checkpointing.load(checkpoint, KITCHEN, i)
+                kitchen.temperature_matrix = state['temperature_matrix']
+                data2_out = state['data2_out']
+                kitchen_relaxation.restore(state['relaxation'])
+                previous[KITCHEN] = state['previous']
+            if ENTRYWAY in rooms:
+                state = checkpointing.load(checkpoint, ENTRYWAY, i)
+                entryway.temperature_matrix = state['temperature_matrix']
+                data3_out = state['data3_out']
+                entryway_relaxation.restore(state['relaxation'])
+                previous[ENTRYWAY] = state['previous']
+            if BATHROOM in rooms:
+                state = checkpointing.load(checkpoint, BATHROOM, i)
+                bathroom.temperature_matrix = state['temperature_matrix']
+                btemp4 = state['btemp4']
+                previous[BATHROOM] = state['previous']
+        i = max(i, 0)
+
+        try:
+            while i < iterations:
+                probe.next_iteration(i + 1)
+                #Dirichlet rooms first, they only need the data of the previous sweep
+                if LIVINGROOM in rooms:
                     g_13, g_12 = livingroom.temp_gradient_calc(btemp3, btemp2)
-                    comm.send(g_12, dest=2, tag=12)
-                    comm.send(g_13, dest=3, tag=13)
+                    exchange.send(g_12, KITCHEN, 12)
+                    exchange.send(g_13, ENTRYWAY, 13)
 
-
-                if rank == 4:
-                    btemp4 = comm.recv(source=3, tag=34)
+                if BATHROOM in rooms:
                     g_43 = bathroom.temp_gradient_calc(btemp4)
-                    comm.send(g_43, dest=3, tag=43)
+                    exchange.send(g_43, ENTRYWAY, 43)
 
-                if rank == 2:
-                    data2_in = comm.recv(source=1, tag=12)
-                    temp2_old = kitchen.temperature_matrix #needed to relax temperature calculations
+                if KITCHEN in rooms:
+                    data2_in = exchange.recv(LIVINGROOM, 12)
                     kitchen.get_temperature_matrix(data2_in)
                     #relaxation step necessary for producing convergent solution.
-                    kitchen.temperature_matrix = (0.8)*kitchen.temperature_matrix + (0.2)*temp2_old
-                    data2_out = kitchen.get_neumann_temps()
-                    comm.send(data2_out, dest=1, tag=21)
-
-                if rank == 3:
-                    data31_in = comm.recv(source=1, tag=13)
-                    data34_in = comm.recv(source=4, tag=43)
-                    temp3_old = entryway.temperature_matrix #needed to relax temperature calculations
+                    kitchen_temps = kitchen.get_neumann_temps()
+                    with probe.phase('relaxation'):
+                        data2_out = kitchen_relaxation(kitchen_temps, data2_out)
+                    exchange.send(data2_out, LIVINGROOM, 21)
+
+                if ENTRYWAY in rooms:
+                    data31_in, data34_in = exchange.recv_all([(LIVINGROOM, 13), (BATHROOM, 43)])
                     entryway.get_temperature_matrix(data34_in, data31_in)
                     #relaxation step necessary for producing convergent solution.
-                    entryway.temperature_matrix = (0.8)*entryway.temperature_matrix + (0.2)*temp3_old
-                    data31_out, data34_out = entryway.get_neumann_temps()
-                    comm.send(data31_out, dest=1, tag=31)
-                    comm.send(data34_out, dest=4, tag=34)
+                    entryway_temps = np.concatenate(entryway.get_neumann_temps())
+                    with probe.phase('relaxation'):
+                        data3_out = entryway_relaxation(entryway_temps, data3_out)
+                    data31_out, data34_out = np.split(data3_out, 2)
+                    exchange.send(data31_out, LIVINGROOM, 31)
+                    exchange.send(data34_out, BATHROOM, 34)
+
+                #the Neumann temperatures are received in the same sweep they are sent
+                if LIVINGROOM in rooms:
+                    btemp2, btemp3 = exchange.recv_all([(KITCHEN, 21), (ENTRYWAY, 31)])
+
+                if BATHROOM in rooms:
+                    btemp4 = exchange.recv(ENTRYWAY, 34)
+
+                exchange.flush()
+
+                current = {}
+                if LIVINGROOM in rooms:
+                    current[LIVINGROOM] = np.concatenate((g_13, g_12))/livingroom.dx
+                if KITCHEN in rooms:
+                    current[KITCHEN] = data2_out
+                if ENTRYWAY in rooms:
+                    current[ENTRYWAY] = data3_out
+                if BATHROOM in rooms:
+                    current[BATHROOM] = g_43/bathroom.dx
+                changes = {room: interface_change(current[room], previous.get(room)) for room in rooms}
+                local_residual = max(changes.values(), default=0.0)
+                #all processes have to agree on when to stop
+                with probe.phase('allreduce'):
+                    residual = comm.allreduce(local_residual, op=max_op)
+                residuals.append(residual)
+                previous = current
                 i += 1
-        #due to blocking communication processes 1 and 4 must first receive
-        if rank == 1:
-            btemp2 = comm.recv(source=2, tag=21)
-            btemp3 = comm.recv(source=3, tag=31)
-            send_temp1 = livingroom.temperature_matrix[1:-1,1:-1] #remove exterior points
-            comm.send(send_temp1, dest=0, tag=10)
-
-        if rank == 2:
-            send_temp2 = kitchen.temperature_matrix[1:-1,1:-1] #remove exterior points
-            comm.send(send_temp2, dest=0, tag=20)
-
-        if rank == 3:
-            send_temp3 = entryway.temperature_matrix[1:-1,1:-1] #remove exterior points
-            comm.send(send_temp3, dest=0, tag=30)
-
-        if rank == 4:
-            btemp4 = comm.recv(source=3, tag=34)
-            send_temp4 = bathroom.temperature_matrix[1:-1,1:-1] #remove exterior points
-            comm.send(send_temp4, dest=0, tag=40)
 
+                if writer is not None and i % checkpoint_every == 0:
+                    states = {}
+                    if LIVINGROOM in rooms:
+                        states[LIVINGROOM] = {'temperature_matrix': livingroom.temperature_matrix,
+                                              'btemp2': btemp2, 'btemp3': btemp3, 'g_12': g_12, 'g_13': g_13}
+                    if KITCHEN in rooms:
+                        states[KITCHEN] = {'temperature_matrix': kitchen.temperature_matrix,
+                                           'data2_out': data2_out, 'relaxation': kitchen_relaxation.state()}
+                    if ENTRYWAY in rooms:
+                        states[ENTRYWAY] = {'temperature_matrix': entryway.temperature_matrix,
+                                            'data3_out': data3_out, 'relaxation': entryway_relaxation.state()}
+                    if BATHROOM in rooms:
+                        states[BATHROOM] = {'temperature_matrix': bathroom.temperature_matrix,
+                                            'btemp4': btemp4, 'g_43': g_43}
+                    for room in states:
+                        states[room].update(previous=current[room], residuals=residuals)
+                    with probe.phase('checkpoint'):
+                        writer.write(i, states)
+
+                record = {'iteration': i, 'residual': residual, 'residuals': changes}
+                if fields is not None:
+                    record['rooms'] = {room: owned[room].temperature_matrix[1:-1,1:-1] for room in rooms}
+                    if fields == 'copy':
+                        record['rooms'] = {room: view.copy() for room, view in record['rooms'].items()}
+                yield record
+
+                if record.get('stop') or (tol is not None and residual < tol):
+                    break
+        except GeneratorExit:
+            #collecting needs every process, this one may be the only one closed
+            return
+
+        if writer is not None:
+            writer.wait()
+        self.profile = probe.report(comm)
+
+        #the interface temperatures the next sweep would start from, for warm starts
+        interfaces = {}
+        if LIVINGROOM in rooms:
+            interfaces['kitchen'], interfaces['entry_east'] = btemp2.copy(), btemp3.copy()
+        if BATHROOM in rooms:
+            interfaces['entry_west'] = btemp4.copy()
+        interfaces = comm.gather(interfaces, root=0)
+        self.interfaces = None
         if rank == 0:
-            om1 = comm.recv(source=1, tag=10)
-            om2 = comm.recv(source=2, tag=20)
-            om3 = comm.recv(source=3, tag=30)
-            om4 = comm.recv(source=4, tag=40)
+            self.interfaces = {name: data for part in interfaces for name, data in part.items()}
+
+        om1 = om2 = om3 = om4 = None
+        if output is None:
+            #send the interior points of every room to the collector on process 0
+            if LIVINGROOM in rooms:
+                exchange.send(livingroom.temperature_matrix[1:-1,1:-1], COLLECTOR, 10)
+
+            if KITCHEN in rooms:
+                exchange.send(kitchen.temperature_matrix[1:-1,1:-1], COLLECTOR, 20)
+
+            if ENTRYWAY in rooms:
+                exchange.send(entryway.temperature_matrix[1:-1,1:-1], COLLECTOR, 30)
+
+            if BATHROOM in rooms:
+                exchange.send(bathroom.temperature_matrix[1:-1,1:-1], COLLECTOR, 40)
+
+            if rank == 0:
+                om1, om2, om3, om4 = exchange.recv_all([(LIVINGROOM, 10), (KITCHEN, 20),
+                                                        (ENTRYWAY, 30), (BATHROOM, 40)])
+
+            exchange.flush()
+        else:
+            #every process writes its rooms straight into the apartment file
+            if rank == 0:
+                field_output.create_field(output, cols, walls)
+            comm.Barrier()
+            field = field_output.open_field(output, 'r+')
+            if LIVINGROOM in rooms:
+                field_output.write_room(field, LIVINGROOM, livingroom.temperature_matrix[1:-1,1:-1])
+            if KITCHEN in rooms:
+                field_output.write_room(field, KITCHEN, kitchen.temperature_matrix[1:-1,1:-1])
+            if ENTRYWAY in rooms:
+                field_output.write_room(field, ENTRYWAY, entryway.temperature_matrix[1:-1,1:-1])
+            if BATHROOM in rooms:
+                field_output.write_room(field, BATHROOM, bathroom.temperature_matrix[1:-1,1:-1])
+            field.flush()
+            del field
+            comm.Barrier()
+            if rank == 0:
+                field = field_output.open_field(output)
+                om1, om2, om3, om4 = [field_output.room_view(field, room) for room in scheduler.ROOMS]
+
+        self.solution = (om1, om2, om3, om4, i, residuals)
+
+    def dirichelt_neumann_iteration(self, heater, aircon, walls, cols, iters, open, on_off, sparse = False, tol = None,
+                                    relax = 'fixed', theta = 0.8, comm_mode = 'buffer', engine = 'mpi',
+                                    solver = 'lu', output = None, checkpoint = None, checkpoint_every = 10,
+                                    resume = False, warm_start = None, profile = False):
+        """
+        Performs the whole Dirichlet/Neumann iteration at once, see
+        dirichlet_neumann_sweeps for the parameters.
+
+        Returns:
+        -------
+        om1, om2, om3, om4 : ndarray, ndarray, ndarray, ndarray
+            Matrices containing the computed heat values on process 0, None on
+            every other process. With output they are views of the memory-mapped
+            apartment.
+
+        iterations : int
+            The number of iterations performed.
 
-        return om1, om2, om3, om4
+        residuals : list of float
+            The interface residual after every iteration.
+        """
+        for record in self.dirichlet_neumann_sweeps(heater, aircon, walls, cols, iters, open, on_off, sparse, tol, relax,
+                                                    theta, comm_mode, engine, solver, output, checkpoint,
+                                                    checkpoint_every, resume, warm_start, profile):
+            pass
+        return self.solution
 
 
 class Problem(Solver):
@@ -207,7 +581,10 @@ class Problem(Solver):
 
 
 
-    def __call__(self, cols, iters, open = False, on_off = False):
+    def __call__(self, cols, iters, open = False, on_off = False, sparse = False, tol = None,
+                 relax = 'fixed', theta = 0.8, comm_mode = 'buffer', engine = 'mpi', solver = 'lu',
+                 output = None, checkpoint = None, checkpoint_every = 10, resume = False, warm_start = None,
+                 profile = False):
         """
         Performs the algorithm and produces the solutions.
 
@@ -217,7 +594,8 @@ class Problem(Solver):
             The number of columns of interior gridpoints to be solved for.
 
         iters : int
-            The number of iterations for the algorithm to perform.
+            The number of iterations for the algorithm to perform, or the
+            maximum number of iterations if tol is given.
 
         open : bool
             Boolean value passed into the problem determin whether or not the patio
@@ -228,39 +606,219 @@ class Problem(Solver):
             acting as a source of heat or a source of cold due to constant vaccum
             being applied at that location.
 
+        sparse : bool
+            Use the scipy.sparse finite difference matrices in every room.
+
+        tol : float
+            Stop as soon as the change of the interface data between two
+            iterations is smaller than tol.
+
+        relax : str
+            Relaxation strategy for the interface temperatures, 'fixed',
+            'aitken' or 'iqn-ils'.
+
+        theta : float
+            The (initial) relaxation factor.
+
+        comm_mode : str
+            'pickle', 'buffer' or 'nonblocking' communication of the interface
+            data.
+
+        engine : str
+            'mpi' to run on the processes started by mpirun, 'serial' to solve
+            every room in this process without MPI, 'monolithic' to solve the
+            whole apartment as one sparse system without iterating.
+
+        solver : str or dict
+            The linear solver of every room, 'lu', 'cg', 'gmres', 'multigrid',
+            'fmg' or 'fft', or a dict with the solver of each room number.
+
+        output : str
+            Path of a .npy file the stitched apartment is written to, every
+            process writing its own rooms. The memory-mapped apartment is kept
+            in self.field and OM1-OM4 are views of it.
+
+        checkpoint : str
+            Directory for periodic checkpoints of the iteration.
+
+        checkpoint_every : int
+            The number of iterations between two checkpoints.
+
+        resume : bool
+            Continue from the last complete checkpoint in checkpoint.
+
+        warm_start : Problem, tuple or initial_guess.InitialGuess
+            Start from a previous result instead of the wall temperatures,
+            e.g. a nearby scenario or a solution for another cols.
+
+        profile : bool
+            Record the time of every phase and the message sizes on every
+            process, see instrumentation. The report is kept in self.profile.
+
         Returns:
         -------
-        None
+        iterations : int
+            The number of iterations performed.
+
+        residuals : list of float
+            The interface residual after every iteration.
+
+        """
+        for record in self.iterate(cols, iters, open, on_off, sparse, tol, relax, theta, comm_mode, engine, solver,
+                                   output, checkpoint, checkpoint_every, resume, warm_start, profile):
+            pass
+        return self.iterations, self.residuals
+
+    def iterate(self, cols, iters, open = False, on_off = False, sparse = False, tol = None,
+                relax = 'fixed', theta = 0.8, comm_mode = 'buffer', engine = 'mpi', solver = 'lu',
+                output = None, checkpoint = None, checkpoint_every = 10, resume = False, warm_start = None,
+                profile = False, fields = None):
+        """
+        Performs the algorithm like __call__, yielding a record after every
+        iteration (see Solver.dirichlet_neumann_sweeps), e.g. to follow the
+        residual live or to stop once the temperatures are good enough:
+
+            for record in problem.iterate(40, 100, fields='view'):
+                if record['residual'] < 1e-4:
+                    record['stop'] = True
+
+        The solutions are stored like by __call__ once the loop ends. Under
+        MPI every process has to stop after the same iteration, which deciding
+        on the agreed 'residual' ensures. Leaving the loop with break or an
+        exception instead closes the iteration without collecting the rooms
+        and stores nothing. The monolithic engine does not iterate and yields
+        nothing.
+
+        Params:
+        -------
+        cols, iters, open, on_off, sparse, tol, relax, theta, comm_mode, engine, solver, output, checkpoint, checkpoint_every, resume, warm_start, profile :
+            See __call__.
+
+        fields : str
+            None, 'view' or 'copy', whether the records hold the interior
+            temperatures of the rooms of this process and if they are copied.
+
+        Yields:
+        -------
+        record : dict
+            'iteration', 'residual', 'residuals' and optionally 'rooms'. Set
+            'stop' to True to end the iteration after it.
 
         """
         self.open = open
         self.on_off = on_off
-        self.OM1, self.OM2, self.OM3, self.OM4 = self.dirichelt_neumann_iteration(self.heater, self.aircon, self.wall, cols, iters, open, on_off)
-
-    def img_creator(self):
+        self.field = None
+        if engine == 'monolithic':
+            self.interfaces = self.profile = None
+            apartment = monolithic_solver.MonolithicSolver(self.heater, self.aircon, self.wall, cols, open, on_off)
+            self.OM1, self.OM2, self.OM3, self.OM4 = apartment.solve()
+            self.iterations, self.residuals = 0, []
+            if output is not None:
+                self.field = field_output.write_field(output, self.OM1, self.OM2, self.OM3, self.OM4, self.wall)
+            return
+        yield from self.dirichlet_neumann_sweeps(self.heater, self.aircon, self.wall, cols, iters, open, on_off,
+                                                 sparse, tol, relax, theta, comm_mode, engine, solver, output,
+                                                 checkpoint, checkpoint_every, resume, warm_start, profile, fields)
+        self.OM1, self.OM2, self.OM3, self.OM4, self.iterations, self.residuals = self.solution
+        if output is not None and self.OM1 is not None:
+            self.field = field_output.open_field(output)
+
+    def img_creator(self, path = None, mode = 'contourf', **options):
         """
         Takes the final solutions from __call__ that performs the iterative algorithm
         for the 2D heat equation using parallel processing.
 
         Params:
         -------
-        None
+        path : str
+            Where the image is saved, by default Temperature_<open>_<on_off>.png
+            in the working directory.
+
+        mode : str
+            'contourf' for the filled contour plot of matplotlib, 'raster'
+            for the fast image of Plotter.render.
+
+        options :
+            Passed on to Plotter.render, e.g. contours.
 
         Returns:
         --------
         None
 
         """
-        apartment = plot_domain.Plotter(self.OM1, self.OM2, self.OM3, self.OM4, self.wall)
-        apartment.room_image(self.heater,self.open,self.on_off)
-
-
-
-
+        if getattr(self, 'field', None) is not None:
+            apartment = plot_domain.Plotter.from_field(self.field)
+        else:
+            apartment = plot_domain.Plotter(self.OM1, self.OM2, self.OM3, self.OM4, self.wall)
+        if mode == 'raster':
+            apartment.render(path if path is not None else 'Temperature_{}_{}.png'.format(self.open, self.on_off),
+                             **options)
+        elif mode == 'contourf':
+            apartment.room_image(self.heater,self.open,self.on_off, path)
+        else:
+            raise ValueError("unknown image mode {!r}, expected 'contourf' or 'raster'".format(mode))
+
+
+def main(argv = None):
+    """
+    Solves one scenario from the command line and saves the image of it.
 
-"""
-mpirun -n 5 python3 problem_solver.py
-"""
-tester = Problem(35, 8, 22)
-tester(20,10,True,True)
-tester.img_creator()
+    mpirun -n 5 python3 problem_solver.py --cols 20 --iters 10 --open --oven   (any number of processes works)
+    python3 problem_solver.py --engine serial --tol 1e-8
+    """
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description='Solves the heat equation in the apartment.')
+    parser.add_argument('--heater', type=float, default=35)
+    parser.add_argument('--aircon', type=float, default=8)
+    parser.add_argument('--walls', type=float, default=22)
+    parser.add_argument('--cols', type=int, default=20)
+    parser.add_argument('--iters', type=int, default=None,
+                        help='the (maximum) number of iterations, by default 10, or 100 with --tol')
+    parser.add_argument('--tol', type=float, default=None)
+    parser.add_argument('--open', action='store_true', help='the patio door is open')
+    parser.add_argument('--oven', action='store_true', help='the oven is on')
+    parser.add_argument('--engine', choices=['mpi', 'serial', 'monolithic'], default='mpi')
+    parser.add_argument('--solver', default='lu', help="'lu', 'cg', 'gmres', 'multigrid', 'fmg' or 'fft'")
+    parser.add_argument('--sparse', action='store_true')
+    parser.add_argument('--relax', choices=['fixed', 'aitken', 'iqn-ils'], default='fixed')
+    parser.add_argument('--theta', type=float, default=0.8)
+    parser.add_argument('--comm-mode', choices=['pickle', 'buffer', 'nonblocking'], default='buffer')
+    parser.add_argument('--output', help='.npy file the apartment is written to')
+    parser.add_argument('--checkpoint', help='directory for checkpoints')
+    parser.add_argument('--checkpoint-every', type=int, default=10,
+                        help='the number of iterations between two checkpoints')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the last complete checkpoint in --checkpoint')
+    parser.add_argument('--trace', help='profile the run and write a Chrome trace to this file')
+    parser.add_argument('--no-image', action='store_true')
+    parser.add_argument('--image-mode', choices=['contourf', 'raster'], default='contourf')
+    args = parser.parse_args(argv)
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume needs --checkpoint')
+    if args.checkpoint_every < 1:
+        parser.error('--checkpoint-every has to be at least 1')
+    if args.iters is None:
+        args.iters = 10 if args.tol is None else 100
+
+    problem = Problem(args.heater, args.aircon, args.walls)
+    iterations, residuals = problem(args.cols, args.iters, args.open, args.oven, args.sparse, args.tol, args.relax,
+                                    args.theta, args.comm_mode, args.engine, args.solver, args.output,
+                                    args.checkpoint, args.checkpoint_every, args.resume,
+                                    profile=args.trace is not None)
+    #only process 0 holds the solution
+    if problem.OM1 is None:
+        return
+    print('{} iterations, residual {}'.format(iterations, residuals[-1] if residuals else None))
+    if args.tol is not None and args.engine != 'monolithic' and not (residuals and residuals[-1] < args.tol):
+        print('warning: stopped after {} iterations without reaching --tol {}, raise --iters'.format(
+            iterations, args.tol), file=sys.stderr)
+    if problem.profile is not None:
+        problem.profile.chrome_trace(args.trace)
+        print('load imbalance {:.2f}'.format(problem.profile.imbalance()['ratio']))
+    if not args.no_image:
+        problem.img_creator(mode=args.image_mode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+
+class FixedRelaxation:
+    """
+    Relaxes the interface temperatures sent back by the Neumann domains with a
+    constant factor, x_new = theta*x_computed + (1 - theta)*x_old.
+
+    Attributes:
+    -----------
+    theta : float
+        The relaxation factor, theta = 1 means no relaxation.
+
+    Methods:
+    --------
+    __call__(self, new, old)
+        Returns the relaxed interface vector.
+
+    state(self)
+        The history of the relaxation, for checkpoints.
+
+    restore(self, state)
+        Continues from a state returned by state.
+
+    """
+
+    def __init__(self, theta = 0.8):
+        """
+
+        Params:
+        -------
+        theta : float
+            The relaxation factor.
+
+        """
+        self.theta = theta
+
+    def __call__(self, new, old):
+        """
+        Params:
+        -------
+        new : ndarray
+            The interface vector computed by the current sweep.
+
+        old : ndarray
+            The relaxed interface vector that was sent in the previous sweep.
+
+        Returns:
+        --------
+        relaxed : ndarray
+            The interface vector to be sent in this sweep.
+
+        """
+        return self.theta*new + (1 - self.theta)*old
+
+    def state(self):
+        """
+        The state needed to continue the relaxation after a restart.
+
+        Returns:
+        --------
+        state : dict
+            Arrays and floats keyed by name.
+        """
+        return {'theta': self.theta}
+
+    def restore(self, state):
+        """
+        Continues from a state returned by state.
+        """
+        self.theta = float(state['theta'])
+
+
+class AitkenRelaxation(FixedRelaxation):
+    """
+    Aitken's dynamic relaxation. The factor is updated at every sweep from the
+    last two interface residuals r = x_computed - x_old,
+
+        theta_k = -theta_(k-1) * r_(k-1).(r_k - r_(k-1)) / |r_k - r_(k-1)|^2
+
+    which removes the slowest mode of the interface error and usually needs far
+    fewer sweeps than a fixed factor.
+
+    Attributes:
+    -----------
+    theta : float
+        The current relaxation factor, starting from the fixed value given.
+
+    theta_max : float
+        Upper bound on the absolute value of theta to keep the first updates
+        from overshooting.
+
+    residual : ndarray
+        The residual of the previous sweep.
+
+    """
+
+    def __init__(self, theta = 0.8, theta_max = 2.0):
+        """
+
+        Params:
+        -------
+        theta : float
+            The relaxation factor used for the first sweep.
+
+        theta_max : float
+            The largest absolute value theta may take.
+
+        """
+        FixedRelaxation.__init__(self, theta)
+        self.theta_max = theta_max
+        self.residual = None
+
+    def __call__(self, new, old):
+        residual = new - old
+        if self.residual is not None:
+            difference = residual - self.residual
+            denominator = np.dot(difference, difference)
+            if denominator > 0:
+                theta = -self.theta*np.dot(self.residual, difference)/denominator
+                self.theta = float(np.clip(theta, -self.theta_max, self.theta_max))
+        self.residual = residual
+        return old + self.theta*residual
+
+    def state(self):
+        state = FixedRelaxation.state(self)
+        if self.residual is not None:
+            state['residual'] = self.residual
+        return state
+
+    def restore(self, state):
+        FixedRelaxation.restore(self, state)
+        self.residual = state.get('residual')
+
+
+class IQNILSRelaxation(FixedRelaxation):
+    """
+    Interface quasi-Newton with an approximation of the inverse Jacobian from a
+    least-squares model (IQN-ILS). The differences of the last residuals V and
+    of the last computed interface vectors W are kept, and the new interface
+    vector is x = x_computed + W*c where c minimizes |V*c + r|.
+
+    Attributes:
+    -----------
+    theta : float
+        The fixed relaxation factor used until there is any history.
+
+    history : int
+        The number of previous sweeps kept in V and W.
+
+    residuals, computed : list of ndarray
+        The residuals and computed interface vectors of the previous sweeps.
+
+    """
+
+    def __init__(self, theta = 0.8, history = 10):
+        """
+
+        Params:
+        -------
+        theta : float
+            The relaxation factor used for the first sweep.
+
+        history : int
+            The number of previous sweeps used in the least squares model.
+
+        """
+        FixedRelaxation.__init__(self, theta)
+        self.history = history
+        self.residuals = []
+        self.computed = []
+
+    def __call__(self, new, old):
+        residual = new - old
+        self.residuals.append(residual)
+        self.computed.append(np.array(new, dtype=float))
+        if len(self.residuals) > self.history + 1:
+            del self.residuals[0], self.computed[0]
+        if len(self.residuals) == 1:
+            return old + self.theta*residual
+        V = np.diff(np.array(self.residuals), axis=0).T
+        W = np.diff(np.array(self.computed), axis=0).T
+        c = np.linalg.lstsq(V, -residual, rcond=None)[0]
+        return new + W.dot(c)
+
+    def state(self):
+        state = FixedRelaxation.state(self)
+        if self.residuals:
+            state['residuals'] = np.array(self.residuals)
+            state['computed'] = np.array(self.computed)
+        return state
+
+    def restore(self, state):
+        FixedRelaxation.restore(self, state)
+        self.residuals = list(state.get('residuals', []))
+        self.computed = list(state.get('computed', []))
+
+
+RELAXATIONS = {'fixed': FixedRelaxation,
+               'aitken': AitkenRelaxation,
+               'iqn-ils': IQNILSRelaxation}
+
+
+def make_relaxation(name = 'fixed', theta = 0.8):
+    """
+    Creates a new relaxation strategy. Every domain that relaxes its interface
+    data needs its own instance since Aitken and IQN-ILS keep a history.
+
+    Params:
+    -------
+    name : str
+        One of 'fixed', 'aitken' or 'iqn-ils'.
+
+    theta : float
+        The (initial) relaxation factor.
+
+    Returns:
+    --------
+    relaxation : FixedRelaxation
+        Callable taking the computed and the previous interface vectors and
+        returning the relaxed interface vector.
+
+    """
+    try:
+        return RELAXATIONS[name](theta)
+    except KeyError:
+        raise ValueError('unknown relaxation {!r}, expected one of {}'.format(
+            name, ', '.join(sorted(RELAXATIONS))))
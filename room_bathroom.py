@@ -5,10 +5,8 @@
 # @Last modified by:   thomas
 # @Last modified time: 2020-09-01T11:50:47+02:00
 
-from numpy import *
 import numpy as np
-from scipy.linalg import solve
-import matrix_creator
+import operator_cache
 
 class BathRoom:
     """
@@ -42,8 +40,22 @@ class BathRoom:
     tsouth : ndarray
         temperature vector for southwall of the bathroom.
 
-    behaviour_matrix : ndarray
-        finite difference matrix using pure dirichelt BCs.
+    sparse : bool
+        Whether the finite difference matrix is stored in scipy.sparse format.
+
+    behaviour_matrix : ndarray, scipy.sparse.csr_matrix or None
+        finite difference matrix using pure dirichelt BCs, None when a matrix-free,
+        multigrid or spectral solver is used.
+
+    linear_solver : object
+        Solver set up once at construction and reused at every step of the
+        iteration: the LU factorization of behaviour_matrix, a matrix-free
+        Krylov, multigrid or spectral solver, see matrix_creator.make_solver.
+        None if the room was created with solver=None.
+
+    rhs_buffer : ndarray
+        (rows+2, cols+2) array holding the right hand side, reused at every
+        step of the iteration.
 
     temperature_matrix : ndarray
         matrix holding the computed temperature that is updated at each step
@@ -51,6 +63,10 @@ class BathRoom:
 
     Methods:
     --------
+    setup_rhs_buffer(self)
+        Preallocates the right hand side vector and fills in the walls that do
+        not change during the iteration.
+
     construct_rhs_vector(self,E)
         Creates the right hand side vector b for solving the linear equation
         Ax = b.
@@ -64,7 +80,7 @@ class BathRoom:
 
     """
 
-    def __init__(self, aircon, walls, cols):
+    def __init__(self, aircon, walls, cols, sparse = False, solver = 'lu'):
         """
         Set up the 2D heat equation problem for the bathroom which shares an
         interface with the entryway. This room uses pure dirichelt conditions.
@@ -82,18 +98,56 @@ class BathRoom:
         cols : int
             Number of interior horizontal gridpoints.
 
+        sparse : bool
+            Assemble the finite difference matrix in scipy.sparse format.
+
+        solver : str or None
+            The linear solver passed to matrix_creator.make_solver, None only
+            assembles the room.
+
         """
         self.dx = 1/cols
         self.cols = cols
+        self.sparse = sparse
         self.rows = 2*cols
         self.tnorth = walls*np.ones(self.cols)
         self.twest = aircon*np.ones(self.rows)
         self.teastt = walls*np.ones(self.cols)#initial temp guess at boundary
         self.teastb = walls*np.ones(self.cols)
         self.tsouth = aircon*np.ones(self.cols)
-        self.behaviour_matrix = matrix_creator.FiniteDiffMatrix(self.rows+2,self.cols+2,'').A
+        self.behaviour_matrix, self.linear_solver = operator_cache.room_operator(self.rows+2,self.cols+2,'', sparse, solver)
+        self.rhs_buffer = self.setup_rhs_buffer()
+
+
+
+    def setup_rhs_buffer(self):
+        """
+        Allocates the right hand side once and fills in the north, south and
+        west walls as well as the lower east wall, none of which change during
+        the iteration.
 
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        rhs_buffer : ndarray
+            Array with shape (rows+2, cols+2) whose upper east column still has
+            to be filled with the interface temperatures.
 
+        """
+        N, S, W = self.tnorth, self.tsouth, self.twest
+        rhs_buffer = np.zeros((self.rows+2, self.cols+2))
+        rhs_buffer[0,1:-1] = -N
+        rhs_buffer[-1,1:-1] = -S
+        rhs_buffer[1:-1,0] = -W
+        rhs_buffer[0,0] = -N[0]-W[0]
+        rhs_buffer[-1,0] = -S[0]-W[-1]
+        #bottom block with dirichlet conditions
+        rhs_buffer[self.cols+1:-1,-1] = -self.teastb
+        rhs_buffer[-1,-1] = -S[-1]-self.teastb[-1]
+        return rhs_buffer
 
     def construct_rhs_vector(self, E):
         """
@@ -111,25 +165,17 @@ class BathRoom:
         Returns:
         --------
         rhs_vec : ndarray
-            The vector of length (cols*rows) containing boundary temperatures and
-            zeros for unknown values.
+            The vector of length ((rows+2)*(cols+2)) containing boundary
+            temperatures and zeros for unknown values. It is a view of
+            rhs_buffer and is overwritten by the next call.
 
 
         """
-        N, S, W = self.tnorth, self.tsouth, self.twest
-        #first row of temperature values containing tnorth
-        rhs_vec = np.concatenate((np.array([-N[0]-W[0]]), -N, np.array([-N[-1]-E[0]])))
+        buf = self.rhs_buffer
         #top block containing interface values
-        for i in range(0,self.cols):
-            temp = np.concatenate((np.array([-W[i]]),np.zeros(self.cols),np.array([-E[i]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
-        #bottom block with dirichlet conditions
-        for i in range(0,self.cols):
-            temp = np.concatenate((np.array([-W[i+self.cols]]), np.zeros(self.cols), np.array([-self.teastb[i]])))
-            rhs_vec = np.concatenate((rhs_vec, temp))
-        #last row of temperature matrixCreator
-        rhs_vec = np.concatenate((rhs_vec,np.array([-S[0]-W[-1]]), -S, np.array([-S[-1]-self.teastb[-1]])))
-        return rhs_vec
+        np.negative(E, out=buf[1:self.cols+1,-1])
+        buf[0,-1] = -self.tnorth[-1]-E[0]
+        return buf.reshape(-1)
 
     def temp_gradient_calc(self, E):
         """
@@ -154,7 +200,7 @@ class BathRoom:
 
         """
         rhs_vector = self.construct_rhs_vector(E)
-        temperature_vector = solve(self.behaviour_matrix, rhs_vector)
+        temperature_vector = self.linear_solver.solve(rhs_vector)
         self.temperature_matrix = temperature_vector.reshape(self.rows+2,self.cols+2)
         gradient_3 = (self.temperature_matrix[1:self.cols+1,-1] - E)*self.dx
         return gradient_3
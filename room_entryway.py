@@ -7,10 +7,8 @@
 
 
 
-from numpy import *
 import numpy as np
-from scipy.linalg import solve
-import matrix_creator
+import operator_cache
 
 
 
@@ -37,8 +35,22 @@ class Entry:
     tsouth : ndarray
         temperature vector for southwall of the entryway.
 
-    behaviour_matrix : ndarray
-        finite difference matrix using pure dirichelt BCs.
+    sparse : bool
+        Whether the finite difference matrix is stored in scipy.sparse format.
+
+    behaviour_matrix : ndarray, scipy.sparse.csr_matrix or None
+        finite difference matrix using neumann BCs at both interfaces, None when a matrix-free,
+        multigrid or spectral solver is used.
+
+    linear_solver : object
+        Solver set up once at construction and reused at every step of the
+        iteration: the LU factorization of behaviour_matrix, a matrix-free
+        Krylov, multigrid or spectral solver, see matrix_creator.make_solver.
+        None if the room was created with solver=None.
+
+    rhs_buffer : ndarray
+        (cols+2, cols+2) array holding the right hand side, reused at every
+        step of the iteration.
 
     temperature_matrix : ndarray
         matrix holding the computed temperature that is updated at each step
@@ -50,6 +62,9 @@ class Entry:
         A function to scale the scale the door to the number of horizontal gridpoints
         used.
 
+    setup_rhs_buffer(self)
+        preallocates the right hand side and fills in the north and south walls.
+
     construct_rhs_vector(self,W,E)
         creates the right hand side vector using the two gradients passed into.
 
@@ -66,7 +81,7 @@ class Entry:
 
     """
 
-    def __init__(self, heater, aircon, walls, cols):
+    def __init__(self, heater, aircon, walls, cols, sparse = False, solver = 'lu'):
         """
         Sets up the 2D linear problem for the entryway domain.
 
@@ -82,7 +97,12 @@ class Entry:
         cols : int
             Number of interior horizontal gridpoints.
 
+        sparse : bool
+            Assemble the finite difference matrix in scipy.sparse format.
 
+        solver : str or None
+            The linear solver passed to matrix_creator.make_solver, None only
+            assembles the room.
 
         Returns:
         --------
@@ -91,10 +111,13 @@ class Entry:
         """
         self.dx = 1/cols
         self.cols = cols
+        self.sparse = sparse
         self.tnorth = self.northwall(aircon, walls, self.cols)
         self.tsouth = walls*np.ones(self.cols)
-        self.behaviour_matrix = matrix_creator.FiniteDiffMatrix(self.cols+2, self.cols+2,'lr').A
-        self.get_temperature_matrix(self.tsouth*self.dx, self.tsouth*self.dx)
+        self.behaviour_matrix, self.linear_solver = operator_cache.room_operator(self.cols+2, self.cols+2,'lr', sparse, solver)
+        self.rhs_buffer = self.setup_rhs_buffer()
+        if self.linear_solver is not None:
+            self.get_temperature_matrix(self.tsouth*self.dx, self.tsouth*self.dx)
 
 
 
@@ -129,6 +152,27 @@ class Entry:
         return wall
 
 
+    def setup_rhs_buffer(self):
+        """
+        Allocates the right hand side once and fills in the north and south
+        walls which do not change during the iteration.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        rhs_buffer : ndarray
+            Array with shape (cols+2, cols+2) whose first and last columns still
+            have to be filled with the interface values.
+
+        """
+        rhs_buffer = np.zeros((self.cols+2, self.cols+2))
+        rhs_buffer[0,1:-1] = -self.tnorth
+        rhs_buffer[-1,1:-1] = -self.tsouth
+        return rhs_buffer
+
     def construct_rhs_vector(self,W,E):
         """
         Creates the vector needed to solve the linear equation approximating the
@@ -149,20 +193,21 @@ class Entry:
         Returns:
         --------
         rhs_vec : ndarray
-            The vector of length (cols*cols) containing boundary temperatures and
-            zeros for unknown values.
+            The vector of length ((cols+2)*(cols+2)) containing boundary
+            temperatures and zeros for unknown values. It is a view of
+            rhs_buffer and is overwritten by the next call.
 
 
         """
-        N,S = self.tnorth, self.tsouth
-        #first row of temperature values containing tnorth
-        rhs_vec = np.concatenate((np.array([-N[0]-W[0]]), -N, np.array([-N[-1]-E[0]])))
-        for i in range(0,self.cols):
-            temp = np.concatenate((np.array([-W[i]]),np.zeros(self.cols),np.array([-E[i]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
-        #last row of temperature matrixCreator
-        rhs_vec = np.concatenate( (rhs_vec,np.array([-S[0]-W[-1]]),-S,np.array([-S[-1]-E[-1]]) ))
-        return rhs_vec
+        N, S, buf = self.tnorth, self.tsouth, self.rhs_buffer
+        np.negative(W, out=buf[1:-1,0])
+        np.negative(E, out=buf[1:-1,-1])
+        #corners shared with the north and south walls
+        buf[0,0] = -N[0]-W[0]
+        buf[0,-1] = -N[-1]-E[0]
+        buf[-1,0] = -S[0]-W[-1]
+        buf[-1,-1] = -S[-1]-E[-1]
+        return buf.reshape(-1)
 
 
     def get_temperature_matrix(self, W, E):
@@ -189,7 +234,7 @@ class Entry:
 
         """
         rhs_vector = self.construct_rhs_vector(W,E)
-        temperature_vector = solve(self.behaviour_matrix,rhs_vector)
+        temperature_vector = self.linear_solver.solve(rhs_vector)
         self.temperature_matrix = temperature_vector.reshape(self.cols+2,self.cols+2)
 
     def get_neumann_temps(self):
@@ -8,8 +8,7 @@
 
 
 import numpy as np
-from scipy.linalg import solve
-import matrix_creator
+import operator_cache
 
 
 class Kitchen:
@@ -47,11 +46,24 @@ class Kitchen:
         The temperature vector for the wall containing the oven and the vent
         over it.
 
-    behaviour_matrix : ndarray
+    sparse : bool
+        Whether the finite difference matrix is stored in scipy.sparse format.
+
+    behaviour_matrix : ndarray, scipy.sparse.csr_matrix or None
         The finite difference matrix that solves for the unknown temperature
         points for the kitchen domain. Adjusted to consider the Neumann BC at
-        the east wall--the interface with the living room.
+        the east wall--the interface with the living room. None when a matrix-free,
+        multigrid or spectral solver is used.
+
+    linear_solver : object
+        Solver set up once at construction and reused at every step of the
+        iteration: the LU factorization of behaviour_matrix, a matrix-free
+        Krylov, multigrid or spectral solver, see matrix_creator.make_solver.
+        None if the room was created with solver=None.
 
+    rhs_buffer : ndarray
+        (cols+2, cols+2) array holding the right hand side, reused at every
+        step of the iteration.
 
 
     Methods:
@@ -60,6 +72,8 @@ class Kitchen:
 
     westwall(self, hot, normal, cold)
 
+    setup_rhs_buffer(self)
+
     construct_rhs_vector(self, E)
 
     get_temperature_matrix(self,E)
@@ -69,7 +83,7 @@ class Kitchen:
     """
 
 
-    def __init__(self, heater, aircon, walls, cols, open = False, on_off = False):
+    def __init__(self, heater, aircon, walls, cols, open = False, on_off = False, sparse = False, solver = 'lu'):
         """
 
 
@@ -86,11 +100,14 @@ class Kitchen:
         self.dx = 1/self.cols
         self.open = open
         self.oven = on_off
+        self.sparse = sparse
         self.tnorth = walls*np.ones(self.cols)
         self.tsouth = self.sw_temp_open_close(heater,aircon,walls)
         self.twest = self.westwall(heater, walls, aircon)
-        self.behaviour_matrix = matrix_creator.FiniteDiffMatrix(self.cols+2,self.cols+2, 'r').A
-        self.get_temperature_matrix(self.tnorth*self.dx)
+        self.behaviour_matrix, self.linear_solver = operator_cache.room_operator(self.cols+2,self.cols+2, 'r', sparse, solver)
+        self.rhs_buffer = self.setup_rhs_buffer()
+        if self.linear_solver is not None:
+            self.get_temperature_matrix(self.tnorth*self.dx)
 
     def sw_temp_open_close(self,hot, cold,normal):
         """
@@ -123,7 +140,7 @@ class Kitchen:
                 wall[-i] = cold
             else:
                 wall[-i] = hot
-        for i in range(int(self.cols/2) - int(self.cols/10)), int((self.cols)/2)):
+        for i in range(int(self.cols/2) - int(self.cols/10), int((self.cols)/2)):
             wall[i] = hot
         return wall
 
@@ -159,6 +176,31 @@ class Kitchen:
                 wall[i] = cold
         return wall
 
+    def setup_rhs_buffer(self):
+        """
+        Allocates the right hand side once and fills in the north, south and
+        west walls which do not change during the iteration.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        rhs_buffer : ndarray
+            Array with shape (cols+2, cols+2) whose last column still has to be
+            filled with the interface values.
+
+        """
+        N, S, W = self.tnorth, self.tsouth, self.twest
+        rhs_buffer = np.zeros((self.cols+2, self.cols+2))
+        rhs_buffer[0,1:-1] = -N
+        rhs_buffer[-1,1:-1] = -S
+        rhs_buffer[1:-1,0] = -W
+        rhs_buffer[0,0] = -N[0]-W[0]
+        rhs_buffer[-1,0] = -S[0]-W[-1]
+        return rhs_buffer
+
     def construct_rhs_vector(self, E):
         """
         Creates the vector needed to solve the linear equation approximating the
@@ -174,19 +216,17 @@ class Kitchen:
         Returns:
         --------
         rhs_vec : ndarray
-            The vector of length (cols*rows) containing boundary temperatures and
-            zeros for unknown values.
+            The vector of length ((cols+2)*(cols+2)) containing boundary
+            temperatures and zeros for unknown values. It is a view of
+            rhs_buffer and is overwritten by the next call.
 
         """
-        N, S, W = self.tnorth, self.tsouth, self.twest
-        #first row of temperature values containing tnorth
-        rhs_vec = np.concatenate((np.array([-N[0]-W[0]]), -N, np.array([-N[-1]-E[0]])))
-        for i in range(self.cols):
-            temp = np.concatenate((np.array([-W[i]]),np.zeros(self.cols),np.array([-E[i]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
-        #last row of temperature matrixCreator
-        rhs_vec = np.concatenate((rhs_vec,np.array([-S[0]-W[-1]]),-S, np.array([-S[-1]-E[-1]]) ))
-        return rhs_vec
+        N, S, buf = self.tnorth, self.tsouth, self.rhs_buffer
+        np.negative(E, out=buf[1:-1,-1])
+        #corners shared with the north and south walls
+        buf[0,-1] = -N[-1]-E[0]
+        buf[-1,-1] = -S[-1]-E[-1]
+        return buf.reshape(-1)
 
 
 
@@ -209,7 +249,7 @@ class Kitchen:
 
         """
         rhs_vector = self.construct_rhs_vector(E)
-        temperature_vector = solve(self.behaviour_matrix,rhs_vector)
+        temperature_vector = self.linear_solver.solve(rhs_vector)
         self.temperature_matrix = temperature_vector.reshape(self.cols+2,self.cols+2)
 
 
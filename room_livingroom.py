@@ -8,8 +8,7 @@
 # @Last modified time: 2020-09-01T13:46:13+02:00
 
 import numpy as np
-from numpy.linalg import solve
-import matrix_creator
+import operator_cache
 
 
 class LivingRoom:
@@ -57,9 +56,22 @@ class LivingRoom:
     twestb : ndarray
         temperature vector containing initial guess at interface with kitchen
 
-    A_mat : ndarray
+    sparse : bool
+        whether the finite difference matrix is stored in scipy.sparse format
+
+    behaviour_matrix : ndarray, scipy.sparse.csr_matrix or None
         tensor matrix describing how the heat equation behaves in rectangular
-        domains
+        domains, None when a matrix-free, multigrid or spectral solver is used
+
+    linear_solver : object
+        Solver set up once at construction and reused at every step of the
+        iteration: the LU factorization of behaviour_matrix, a matrix-free
+        Krylov, multigrid or spectral solver, see matrix_creator.make_solver.
+        None if the room was created with solver=None.
+
+    rhs_buffer : ndarray
+        (rows+2, cols+2) array holding the right hand side, reused at every
+        step of the iteration.
 
     temp_mat : ndarray
         computed temperature distribution used to model domain and calculate the
@@ -72,6 +84,10 @@ class LivingRoom:
         gridpoints used. Depending on open or closed will prescribe hot or cold
         temperatures where the door is.
 
+    setup_rhs_buffer(self)
+        Preallocates the right hand side buffer and writes the boundary
+        temperatures that do not change between iterations.
+
     construct_rhs_vector(self, WA, WB)
         Constructs the vector used for solving the linear equation Ax = b.
 
@@ -84,18 +100,20 @@ class LivingRoom:
 
     """
 
-    def __init__(self, heater, aircon, walls, cols, open = False):
+    def __init__(self, heater, aircon, walls, cols, open = False, sparse = False, solver = 'lu'):
         self.dx = 1/cols
         self.cols = cols
         self.rows = 2*cols
         self.open = open
+        self.sparse = sparse
         self.tnorth = walls*np.ones(self.cols)
         self.teast = walls*np.ones(1)
         self.tsouth = self.sw_temp_open_close(heater,aircon,walls)
         self.twestt = walls*np.ones(int(self.cols/2)) #boundary guess with Entry
         self.twestm = self.teast.copy()
         self.twestb = walls*np.ones(self.cols)#bounday guess with Kitchen
-        self.behaviour_matrix = matrix_creator.FiniteDiffMatrix(self.rows+2,self.cols+2,'').A
+        self.behaviour_matrix, self.linear_solver = operator_cache.room_operator(self.rows+2,self.cols+2,'', sparse, solver)
+        self.rhs_buffer = self.setup_rhs_buffer()
 
 
 
@@ -130,6 +148,35 @@ class LivingRoom:
 
 
 
+    def setup_rhs_buffer(self):
+        """
+        Allocates the right hand side once and fills in the north, south and
+        east walls as well as the part of the west wall between the two
+        interfaces, none of which change during the iteration.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        rhs_buffer : ndarray
+            Array with shape (rows+2, cols+2) whose first column still has to
+            be filled with the interface temperatures.
+
+        """
+        N, S, E, WM = self.tnorth, self.tsouth, self.teast, self.twestm
+        rhs_buffer = np.zeros((self.rows+2, self.cols+2))
+        rhs_buffer[0,1:-1] = -N
+        rhs_buffer[-1,1:-1] = -S
+        rhs_buffer[:,-1] = -E[0]
+        rhs_buffer[0,-1] -= N[-1]
+        rhs_buffer[-1,-1] -= S[-1]
+        #rows between interfaces containing wall temps on both sides
+        rhs_buffer[len(self.twestt)+1:self.cols+1,0] = -WM[0]
+        return rhs_buffer
+
+
     def construct_rhs_vector(self, WA, WB):
         """
         Creates a 1D array of internal and external temperatures as Dirichlet conditions
@@ -148,28 +195,20 @@ class LivingRoom:
         Returns:
         --------
         rhs_vec : ndarray
-            The vector of length (cols*cols) containing boundary temperatures and
-            zeros for unknown values.
+            The vector of length ((rows+2)*(cols+2)) containing boundary
+            temperatures and zeros for unknown values. It is a view of
+            rhs_buffer and is overwritten by the next call.
 
         """
-        N, S, E, WM = self.tnorth, self.tsouth, self.teast, self.twestm
-        #For the first row of temperatures of the matrix A
-        rhs_vec = np.concatenate((np.array([-N[0]-WA[0]]), -N, np.array([-N[-1]-E[0]])))
+        N, S, buf = self.tnorth, self.tsouth, self.rhs_buffer
         #rows containing interface with entryway
-        for i in range(len(self.twestt)):
-            temp = np.concatenate((np.array([-WA[i]]),np.zeros(self.cols),np.array([-E[0]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
-        #rows between interfaces containing wall temps on both sides
-        for i in range((self.cols-len(self.twestt))):
-            temp = np.concatenate((np.array([-WM[0]]), np.zeros(self.cols), np.array([-E[0]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
+        np.negative(WA, out=buf[1:len(self.twestt)+1,0])
         #rows containing interface with kitchen
-        for i in range(self.cols):
-            temp = np.concatenate((np.array([-WB[i]]),np.zeros(self.cols),np.array([-E[0]])))
-            rhs_vec = np.concatenate((rhs_vec,temp))
-        #last row of temperature matrixCreator
-        rhs_vec = np.concatenate((rhs_vec,np.array([-S[0]-WB[-1]]),-S,np.array([-S[-1]-E[0]])))
-        return rhs_vec
+        np.negative(WB, out=buf[self.cols+1:-1,0])
+        #corners shared with the north and south walls
+        buf[0,0] = -N[0]-WA[0]
+        buf[-1,0] = -S[0]-WB[-1]
+        return buf.reshape(-1)
 
 
     def temp_gradient_calc(self, WA, WB):
@@ -200,7 +239,7 @@ class LivingRoom:
 
         """
         rhs_vector = self.construct_rhs_vector(WA,WB)
-        temperature_vector = solve(self.behaviour_matrix,rhs_vector)
+        temperature_vector = self.linear_solver.solve(rhs_vector)
         self.temperature_matrix = temperature_vector.reshape(self.rows+2,self.cols+2)
         #calculate the gradients at the upper and lower westwall interfaces
         gradient_3 = (WA - self.temperature_matrix[1:len(self.twestt)+1,0])*self.dx
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Solves every scenario of a scenario file in a pool of processes, without MPI,
+and writes the apartment of each one (.npy, see field_output), its image and a
+manifest.json describing the run into an output directory.
+
+python3 scenario_runner.py scenarios/apartment.toml --output-dir results [--jobs 4] [--image-mode contourf] [--no-images]
+
+A scenario file (.json, .toml, or .yaml/.yml with PyYAML installed) holds a
+list of scenarios and optionally the defaults they share, e.g. in TOML:
+
+    [defaults]
+    heater = 35
+    aircon = 8
+    walls = 22
+    cols = 20
+    tol = 1e-8
+
+    [[scenarios]]
+    name = "door_open_oven_on"
+    open = true
+    on_off = true
+
+Every scenario and the defaults may set the keys of DEFAULTS, other keys are
+rejected. Scenarios without a name are numbered, names are used as file names
+and cannot contain path separators.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+#the settings of a scenario that are not given in the file
+DEFAULTS = {'heater': 35, 'aircon': 8, 'walls': 22, 'open': False, 'on_off': False,
+            'cols': 20, 'iters': 100, 'tol': 1e-8, 'engine': 'serial', 'solver': 'lu',
+            'sparse': False, 'relax': 'fixed', 'theta': 0.8}
+
+ENGINES = ('serial', 'monolithic')
+
+
+def read_file(path):
+    """
+    Parses a scenario file according to its extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            #before Python 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError('reading {} needs PyYAML, use a .json or .toml scenario file instead'.format(path))
+        with open(path) as f:
+            return yaml.safe_load(f)
+    raise ValueError('unknown scenario file type {!r}, expected .json, .toml, .yaml or .yml'.format(extension))
+
+
+def valid_name(name):
+    """
+    Whether a scenario name can be used as a file name in the output directory.
+    """
+    separators = {'/', '\\', os.sep, os.altsep} - {None}
+    return (isinstance(name, str) and name not in ('', '.', '..')
+            and not any(separator in name for separator in separators))
+
+
+def load_scenarios(path):
+    """
+    Reads the scenarios of a file and fills in the defaults.
+
+    Params:
+    -------
+    path : str
+        The scenario file.
+
+    Returns:
+    --------
+    scenarios : list of dict
+        Every scenario with 'name' and all keys of DEFAULTS.
+
+    """
+    content = read_file(path)
+    if isinstance(content, list):
+        content = {'scenarios': content}
+    unknown = set(content.get('defaults', {})) - set(DEFAULTS)
+    if unknown:
+        raise ValueError('unknown settings {} in the defaults'.format(', '.join(sorted(unknown))))
+    defaults = dict(DEFAULTS, **content.get('defaults', {}))
+    scenarios = []
+    for k, given in enumerate(content.get('scenarios', [])):
+        unknown = set(given) - set(DEFAULTS) - {'name'}
+        if unknown:
+            raise ValueError('unknown settings {} in scenario {}'.format(', '.join(sorted(unknown)), k))
+        scenario = dict(defaults, **given)
+        scenario.setdefault('name', '{:03d}'.format(k))
+        if not valid_name(scenario['name']):
+            raise ValueError('scenario {} is named {!r}, names become file names in the output directory and '
+                             'have to be strings without path separators'.format(k, scenario['name']))
+        if scenario['engine'] not in ENGINES:
+            raise ValueError('scenario {} uses engine {!r}, the scenarios are run without MPI so it has to be '
+                             'one of {}'.format(scenario['name'], scenario['engine'], ', '.join(ENGINES)))
+        if scenario['cols'] % 2:
+            raise ValueError('scenario {} has an odd cols, the apartment can only be stitched together for an '
+                             'even number of columns'.format(scenario['name']))
+        scenarios.append(scenario)
+    names = [scenario['name'] for scenario in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError('the scenario names have to be unique, they name the output files')
+    return scenarios
+
+
+def run_scenario(scenario, directory, image = True, image_mode = 'raster', contours = None):
+    """
+    Solves one scenario and writes its files, run in the worker processes.
+
+    Params:
+    -------
+    scenario : dict
+        A scenario as returned by load_scenarios.
+
+    directory : str
+        The output directory.
+
+    image : bool
+        Also save the image of the apartment.
+
+    image_mode : str
+        'raster' for the fast image of plot_domain.Plotter.render, 'contourf'
+        for the matplotlib contour plot.
+
+    contours : int
+        The number of isotherms drawn on raster images.
+
+    Returns:
+    --------
+    entry : dict
+        The manifest entry of the scenario: the scenario itself, 'iterations',
+        'residual', 'seconds' and the names of the files written, or 'error'
+        if it failed.
+
+    """
+    from problem_solver import Problem
+    entry = {'scenario': scenario}
+    field = scenario['name'] + '.npy'
+    start = time.perf_counter()
+    try:
+        problem = Problem(scenario['heater'], scenario['aircon'], scenario['walls'])
+        iterations, residuals = problem(scenario['cols'], scenario['iters'], scenario['open'], scenario['on_off'],
+                                        scenario['sparse'], scenario['tol'], scenario['relax'], scenario['theta'],
+                                        engine=scenario['engine'], solver=scenario['solver'],
+                                        output=os.path.join(directory, field))
+        entry.update(iterations=iterations, residual=residuals[-1] if residuals else None, field=field)
+        if image:
+            entry['image'] = scenario['name'] + '.png'
+            options = {'contours': contours} if image_mode == 'raster' else {}
+            problem.img_creator(os.path.join(directory, entry['image']), image_mode, **options)
+    except Exception as error:
+        entry['error'] = '{}: {}'.format(type(error).__name__, error)
+    entry['seconds'] = time.perf_counter() - start
+    return entry
+
+
+def run_scenarios(scenarios, directory, jobs = None, image = True, image_mode = 'raster', contours = None):
+    """
+    Solves the scenarios in a process pool and writes the manifest.
+
+    Params:
+    -------
+    scenarios : list of dict
+        See load_scenarios.
+
+    directory : str
+        The output directory, created if needed.
+
+    jobs : int
+        The number of worker processes, by default one per core.
+
+    image : bool
+        Also save the image of every apartment.
+
+    image_mode, contours :
+        See run_scenario.
+
+    Returns:
+    --------
+    manifest : dict
+        The content of manifest.json, the entries in the order of the
+        scenarios.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        n = len(scenarios)
+        entries = list(pool.map(run_scenario, scenarios, [directory]*n, [image]*n, [image_mode]*n, [contours]*n))
+    manifest = {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'seconds': time.perf_counter() - start,
+                'scenarios': entries}
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenarios', help='the scenario file, .json, .toml, .yaml or .yml')
+    parser.add_argument('--output-dir', default='results')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='the number of processes, by default one per core')
+    parser.add_argument('--no-images', action='store_true')
+    parser.add_argument('--image-mode', choices=['raster', 'contourf'], default='raster')
+    parser.add_argument('--contours', type=int, default=None,
+                        help='the number of isotherms drawn on raster images')
+    args = parser.parse_args(argv)
+
+    manifest = run_scenarios(load_scenarios(args.scenarios), args.output_dir, args.jobs, not args.no_images,
+                             args.image_mode, args.contours)
+    failed = 0
+    for entry in manifest['scenarios']:
+        if 'error' in entry:
+            failed += 1
+            print('{:>24}  failed: {}'.format(entry['scenario']['name'], entry['error']))
+        else:
+            print('{:>24}  {:4d} iterations  {:8.3f} s'.format(entry['scenario']['name'], entry['iterations'],
+                                                              entry['seconds']))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
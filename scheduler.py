@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+#room numbers, also used as the digits of the message tags (12 is sent from
+#the living room to the kitchen, 10 from the living room to the collector)
+COLLECTOR = 0
+LIVINGROOM = 1
+KITCHEN = 2
+ENTRYWAY = 3
+BATHROOM = 4
+ROOMS = (LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM)
+
+
+def room_weights(cols):
+    """
+    The number of unknowns of every room, used as an estimate of the work
+    done for it in each iteration.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of interior gridpoints of the living room.
+
+    Returns:
+    --------
+    weights : dict
+        Maps each room number to its number of unknowns.
+
+    """
+    half = int(cols/2)
+    return {LIVINGROOM: (2*cols+2)*(cols+2),
+            KITCHEN: (cols+2)**2,
+            ENTRYWAY: (half+2)**2,
+            BATHROOM: (2*half+2)*(half+2)}
+
+
+class RoomScheduler:
+    """
+    Maps the four rooms onto the processes of a communicator of any size.
+    Rooms are handed out largest first to the process with the least work so
+    far (longest processing time first), process 0 included. With fewer than
+    four processes several rooms share a process, with more than four the
+    surplus processes are left without a room and idle.
+
+    A room is never split over several processes: the room solvers (LU, the
+    Krylov methods, multigrid and FFT) all work on a whole room in one
+    process, so a sub-communicator per room would need distributed versions of
+    them. Four processes, one per room, are therefore the most that do work;
+    the living room, which has twice the unknowns of the kitchen, bounds the
+    time of a sweep.
+
+    Attributes:
+    -----------
+    size : int
+        The number of processes.
+
+    owners : dict
+        Maps each room number to the process that solves it, the collector
+        (room 0) is always process 0.
+
+    loads : list of int
+        The number of unknowns assigned to every process.
+
+    Methods:
+    --------
+    owner(self, room)
+        The process that owns a room.
+
+    rooms_of(self, rank)
+        The rooms solved by a process.
+
+    imbalance(self)
+        The largest load divided by the mean load of the processes with work.
+
+    """
+
+    def __init__(self, size, cols):
+        """
+
+        Params:
+        -------
+        size : int
+            The number of processes available.
+
+        cols : int
+            The number of columns of interior gridpoints of the living room.
+
+        """
+        if size < 1:
+            raise ValueError('at least one process is needed, got {}'.format(size))
+        self.size = size
+        self.owners = {COLLECTOR: 0}
+        self.loads = [0]*size
+        weights = room_weights(cols)
+        for room in sorted(ROOMS, key=lambda room: (-weights[room], room)):
+            rank = min(range(size), key=lambda rank: (self.loads[rank], rank))
+            self.owners[room] = rank
+            self.loads[rank] += weights[room]
+
+    def owner(self, room):
+        return self.owners[room]
+
+    def rooms_of(self, rank):
+        return [room for room in ROOMS if self.owners[room] == rank]
+
+    def imbalance(self):
+        loads = [load for load in self.loads if load]
+        return max(loads)/(sum(loads)/len(loads))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from scipy.linalg import solve_banded
+from scipy.sparse.linalg import LinearOperator, cg, gmres
+
+
+def apply_stencil(u, condition = ''):
+    """
+    Applies the 5-point finite difference stencil of FiniteDiffMatrix to a 2D
+    temperature array without forming the matrix.
+
+    Params:
+    -------
+    u : ndarray
+        Array with shape (rows, cols).
+
+    condition : string
+        'l' and 'r' give homogenous Neumann BCs at the left and right edges,
+        exactly like the stamp edits of FiniteDiffMatrix.create_kron_stamp.
+
+    Returns:
+    --------
+    Au : ndarray
+        Array with shape (rows, cols), equal to (A*u.ravel()).reshape(u.shape).
+
+    """
+    Au = -4*u
+    Au[:,1:] += u[:,:-1]
+    Au[:,:-1] += u[:,1:]
+    Au[1:,:] += u[:-1,:]
+    Au[:-1,:] += u[1:,:]
+    #mirrored neighbour counted twice at neumann edges
+    if 'l' in condition:
+        Au[:,0] += u[:,1]
+    if 'r' in condition:
+        Au[:,-1] += u[:,-2]
+    return Au
+
+
+def neumann_weights(cols, condition = ''):
+    """
+    Column weights that make the stencil symmetric: rows of the matrix at a
+    Neumann edge are scaled by 1/2, which turns the 2 of the stamp edit into
+    the 1 of the transposed entry.
+
+    Params:
+    -------
+    cols : int
+        The number of columns of the grid.
+
+    condition : string
+        See apply_stencil.
+
+    Returns:
+    --------
+    weights : ndarray
+        Vector of length cols.
+
+    """
+    weights = np.ones(cols)
+    if 'l' in condition:
+        weights[0] = 0.5
+    if 'r' in condition:
+        weights[-1] = 0.5
+    return weights
+
+
+class StencilOperator(LinearOperator):
+    """
+    The finite difference matrix of FiniteDiffMatrix as a scipy LinearOperator
+    acting on flattened (rows, cols) temperature arrays through apply_stencil.
+    Only needs memory for a couple of grid sized arrays.
+
+    Attributes:
+    -----------
+    rows, cols : int
+        The shape of the grid.
+
+    condition : string
+        The Neumann BCs, see apply_stencil.
+
+    """
+
+    def __init__(self, rows, cols, condition = ''):
+        self.rows = rows
+        self.cols = cols
+        self.condition = condition or ''
+        LinearOperator.__init__(self, np.float64, (rows*cols, rows*cols))
+
+    def _matvec(self, x):
+        return apply_stencil(x.reshape(self.rows, self.cols), self.condition).ravel()
+
+
+class KrylovSolver:
+    """
+    Matrix-free solver for a room. 'cg' runs the conjugate gradient method on
+    the symmetrized, positive definite system -W*A*x = -W*b (W from
+    neumann_weights), 'gmres' runs GMRES on A*x = b directly. Both are
+    preconditioned with exact solves of the tridiagonal row blocks (line
+    Jacobi). After the first call they solve for the correction to the
+    solution of the previous call, which is small during the Dirichlet/Neumann
+    iteration, and rtol applies to the residual the previous solution leaves
+    with the new right hand side. Small changes of the right hand side are
+    therefore resolved as accurately as large ones instead of falling below
+    a tolerance set by the whole right hand side.
+
+    Attributes:
+    -----------
+    method : str
+        'cg' or 'gmres'.
+
+    rtol : float
+        Relative tolerance of the Krylov method, relative to the initial
+        residual.
+
+    maxiter : int or None
+        Maximum number of iterations of the Krylov method.
+
+    operator : LinearOperator
+        The matrix of the system solved.
+
+    preconditioner : LinearOperator
+        The line Jacobi preconditioner.
+
+    x0 : ndarray or None
+        The solution of the previous call.
+
+    iterations : int
+        The number of iterations used by the last call.
+
+    Methods:
+    --------
+    solve(self, rhs)
+        Solves A*x = rhs.
+
+    """
+
+    def __init__(self, rows, cols, condition = '', method = 'cg', rtol = 1e-10, maxiter = None):
+        """
+
+        Params:
+        -------
+        rows, cols : int
+            The shape of the grid, as passed to FiniteDiffMatrix.
+
+        condition : string
+            The Neumann BCs, as passed to FiniteDiffMatrix.
+
+        method : str
+            'cg' or 'gmres'.
+
+        rtol : float
+            Relative tolerance of the Krylov method.
+
+        maxiter : int
+            Maximum number of iterations of the Krylov method.
+
+        """
+        if method not in ('cg', 'gmres'):
+            raise ValueError("unknown Krylov method {!r}, expected 'cg' or 'gmres'".format(method))
+        self.rows = rows
+        self.cols = cols
+        self.method = method
+        self.rtol = rtol
+        self.maxiter = maxiter
+        self.x0 = None
+        self.iterations = 0
+        stencil = StencilOperator(rows, cols, condition)
+        #row scaling, the identity for gmres
+        self.weights = neumann_weights(cols, condition) if method == 'cg' else np.ones(cols)
+        scale = -1 if method == 'cg' else 1
+        w = np.tile(scale*self.weights, rows)
+        self.operator = LinearOperator(stencil.shape, matvec=lambda x: w*stencil.matvec(x), dtype=np.float64)
+        #tridiagonal block of one grid row in banded storage
+        self.bands = np.zeros((3, cols))
+        self.bands[0,1:] = 1
+        self.bands[1,:] = -4
+        self.bands[2,:-1] = 1
+        if 'l' in stencil.condition:
+            self.bands[0,1] = 2
+        if 'r' in stencil.condition:
+            self.bands[2,-2] = 2
+        #rows are scaled like the system: band entry (u, j) belongs to row j+1-u
+        for u in range(3):
+            self.bands[u] *= scale*np.roll(self.weights, 1 - u)
+        self.preconditioner = LinearOperator(stencil.shape, matvec=self.line_solve, dtype=np.float64)
+
+    def line_solve(self, r):
+        """
+        Solves the tridiagonal system of every grid row at once.
+
+        Params:
+        -------
+        r : ndarray
+            Flattened residual.
+
+        Returns:
+        --------
+        z : ndarray
+            Flattened preconditioned residual.
+
+        """
+        z = solve_banded((1, 1), self.bands, r.reshape(self.rows, self.cols).T, check_finite=False)
+        return z.T.ravel()
+
+    def solve(self, rhs):
+        """
+        Params:
+        -------
+        rhs : ndarray
+            The right hand side vector of length rows*cols.
+
+        Returns:
+        --------
+        x : ndarray
+            The solution of A*x = rhs.
+
+        """
+        b = np.tile(self.weights, self.rows)*rhs
+        if self.method == 'cg':
+            b = -b
+        self.iterations = 0
+
+        def count(xk):
+            self.iterations += 1
+
+        #the correction to the previous solution, its initial residual sets the tolerance
+        x0 = np.zeros_like(b) if self.x0 is None else self.x0
+        r = b - self.operator.matvec(x0)
+        if not np.any(r):
+            #the previous solution solves the system exactly
+            return x0
+        if self.method == 'cg':
+            dx, info = cg(self.operator, r, rtol=self.rtol, atol=0.,
+                          maxiter=self.maxiter, M=self.preconditioner, callback=count)
+        else:
+            dx, info = gmres(self.operator, r, rtol=self.rtol, atol=0., restart=50,
+                             maxiter=self.maxiter, M=self.preconditioner,
+                             callback=count, callback_type='pr_norm')
+        if info != 0:
+            raise RuntimeError('{} did not converge to rtol={} ({})'.format(self.method, self.rtol, info))
+        self.x0 = x0 + dx
+        return self.x0
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import scipy.sparse as sp
+import room_kitchen, room_bathroom, room_livingroom, room_entryway
+import matrix_creator, relaxation, initial_guess
+from scheduler import LIVINGROOM, KITCHEN, ENTRYWAY, BATHROOM
+
+#weight of the new time level in the theta method of each scheme
+SCHEMES = {'backward-euler': 1.0, 'crank-nicolson': 0.5}
+
+
+class TimeStepSolver:
+    """
+    Stands in for the linear solver of a room during a time dependent run, so
+    the rooms' own solve methods perform time steps. With the room's equations
+    A*u = b, r = diffusivity*dt/dx^2 and the theta method
+
+        (I - theta*r*A)*u_new = (I + (1-theta)*r*A)*u_old - r*(theta*b_new + (1-theta)*b_old)
+
+    is divided by -theta*r, which leaves the room's right hand side b_new as
+    the only part that changes within a time step:
+
+        (A - I/(theta*r))*u_new = b_new + history
+
+    The matrix on the left is factorized once and reused for every step and
+    every interface iteration.
+
+    Attributes:
+    -----------
+    theta : float
+        1 for backward Euler, 1/2 for Crank-Nicolson.
+
+    r : float
+        diffusivity*dt/dx^2.
+
+    A : ndarray or scipy.sparse matrix
+        The finite difference matrix of the room.
+
+    factorization : matrix_creator.FactorizedMatrix
+        The factorization of A - I/(theta*r).
+
+    u : ndarray
+        The temperatures of the last solve, the old time level at the start of
+        a step.
+
+    rhs : ndarray
+        The right hand side of the last solve, b_old at the start of a step.
+
+    history : ndarray
+        The part of the right hand side fixed by the old time level.
+
+    Methods:
+    --------
+    start_step(self)
+        Makes the last solution the old time level.
+
+    solve(self, rhs)
+        Solves for the new time level with the room's right hand side rhs.
+
+    """
+
+    def __init__(self, A, r, theta, u, rhs):
+        """
+
+        Params:
+        -------
+        A : ndarray or scipy.sparse matrix
+            The finite difference matrix of the room.
+
+        r : float
+            diffusivity*dt/dx^2.
+
+        theta : float
+            The weight of the new time level.
+
+        u : ndarray
+            All temperatures of the room at the start.
+
+        rhs : ndarray
+            The room's right hand side at the start, built from the interface
+            data belonging to u.
+
+        """
+        self.A = A
+        self.r = r
+        self.theta = theta
+        identity = sp.identity(A.shape[0], format='csr') if sp.issparse(A) else np.eye(A.shape[0])
+        self.factorization = matrix_creator.FactorizedMatrix(A - identity/(theta*r))
+        self.u = np.array(u, dtype=float).ravel()
+        self.rhs = np.array(rhs, dtype=float).ravel()
+        self.history = None
+
+    def start_step(self):
+        self.history = -self.u/(self.theta*self.r)
+        if self.theta < 1:
+            self.history += (1 - self.theta)/self.theta*(self.rhs - self.A.dot(self.u))
+
+    def solve(self, rhs):
+        #rhs is a view of the room's buffer and changes with the next call
+        self.rhs = np.array(rhs)
+        self.u = self.factorization.solve(self.rhs + self.history)
+        return self.u
+
+
+class CurrentState:
+    """
+    Stands in for the linear solver of a room and returns its temperatures
+    unchanged, so that the room methods build the right hand side and interface
+    data of the state the room is in.
+    """
+
+    def __init__(self, room):
+        self.room = room
+
+    def solve(self, rhs):
+        return self.room.temperature_matrix.ravel()
+
+
+class TransientSolver:
+    """
+    Time dependent heat equation in the apartment, e.g. how it warms up after
+    the heater is turned on or cools down once the patio door is opened. Every
+    room takes time steps with backward Euler or Crank-Nicolson through a
+    TimeStepSolver, and in every time step the rooms are coupled by
+    Dirichlet/Neumann sweeps as in problem_solver.Solver until the interface
+    data settles. All rooms are solved in this process.
+
+    Attributes:
+    -----------
+    dt : float
+        The time step.
+
+    time : float
+        The time reached.
+
+    steps : int
+        The number of time steps taken.
+
+    sweeps : int
+        The maximum number of Dirichlet/Neumann sweeps per time step.
+
+    tol : float
+        The interface residual that ends the sweeps of a time step.
+
+    livingroom, kitchen, entryway, bathroom :
+        The rooms, their temperature_matrix holds the newest time level.
+
+    Methods:
+    --------
+    step(self)
+        Advances the apartment by one time step.
+
+    run(self, steps, every)
+        Generator yielding a snapshot every few time steps.
+
+    """
+
+    def __init__(self, heater, aircon, walls, cols, open = False, on_off = False, dt = 1e-3,
+                 scheme = 'crank-nicolson', diffusivity = 1.0, initial = None, sweeps = 20, tol = 1e-8,
+                 relax = 'fixed', theta = 0.8):
+        """
+
+        Params:
+        -------
+        heater, aircon, walls : float
+            The boundary temperatures, see problem_solver.Problem.
+
+        cols : int
+            The number of columns of interior gridpoints to be solved for.
+
+        open, on_off : bool
+            Whether the patio door is open and the oven is on.
+
+        dt : float
+            The time step, with the living room 1 wide.
+
+        scheme : str
+            'backward-euler' or 'crank-nicolson'.
+
+        diffusivity : float
+            The thermal diffusivity of the air.
+
+        initial : Problem, tuple or initial_guess.InitialGuess
+            The temperatures at time 0, e.g. the steady state with the door
+            closed. Every room is solved once with the interface temperatures
+            of it, which fills in the unknowns next to the walls that the
+            interior temperatures leave out. By default every room starts at
+            the wall temperature.
+
+        sweeps : int
+            The maximum number of Dirichlet/Neumann sweeps per time step.
+
+        tol : float
+            The sweeps of a time step stop once the interface residual is below
+            tol.
+
+        relax : str
+            The relaxation of the interface temperatures, 'fixed', 'aitken'
+            or 'iqn-ils'. Restarted in every time step.
+
+        theta : float
+            The (initial) relaxation factor.
+
+        """
+        if scheme not in SCHEMES:
+            raise ValueError('unknown time stepping scheme {!r}, expected one of {}'.format(
+                scheme, ', '.join(sorted(SCHEMES))))
+        self.dt = dt
+        self.time = 0.0
+        self.steps = 0
+        self.sweeps = sweeps
+        self.tol = tol
+        self.relax = relax
+        self.theta = theta
+        #the rooms only assemble their matrices, the time steppers factorize
+        self.livingroom = room_livingroom.LivingRoom(heater, aircon, walls, cols, open, True, None)
+        self.kitchen = room_kitchen.Kitchen(heater, aircon, walls, cols, open, on_off, True, None)
+        self.entryway = room_entryway.Entry(heater, aircon, walls, int(cols/2), True, None)
+        self.bathroom = room_bathroom.BathRoom(aircon, walls, int(cols/2), True, None)
+        rooms = {LIVINGROOM: self.livingroom, KITCHEN: self.kitchen,
+                 ENTRYWAY: self.entryway, BATHROOM: self.bathroom}
+
+        half = int(cols/2)
+        if initial is None:
+            for room in rooms.values():
+                room.temperature_matrix = walls*np.ones(room.rhs_buffer.shape)
+            self.btemp2, self.btemp3, self.btemp4 = walls*np.ones(cols), walls*np.ones(half), walls*np.ones(half)
+        else:
+            guess = initial_guess.make_initial_guess(initial, cols)
+            for number, room in rooms.items():
+                guess.seed(room, number)
+            self.btemp2, self.btemp3, self.btemp4 = guess.kitchen, guess.entry_east, guess.entry_west
+
+        #one sweep without relaxation makes every room agree with the
+        #interface data it starts from and leaves its right hand side behind
+        for room in rooms.values():
+            if initial is None:
+                room.linear_solver = CurrentState(room)
+            else:
+                room.linear_solver = matrix_creator.FactorizedMatrix(room.behaviour_matrix)
+        g_13, g_12 = self.livingroom.temp_gradient_calc(self.btemp3, self.btemp2)
+        g_43 = self.bathroom.temp_gradient_calc(self.btemp4)
+        self.kitchen.get_temperature_matrix(g_12)
+        self.entryway.get_temperature_matrix(g_43, g_13)
+
+        #the rooms share the grid spacing of the living room
+        r = diffusivity*dt*cols**2
+        for room in rooms.values():
+            room.linear_solver = TimeStepSolver(room.behaviour_matrix, r, SCHEMES[scheme], room.temperature_matrix,
+                                                room.rhs_buffer)
+
+    def step(self):
+        """
+        Advances the apartment by one time step.
+
+        Params:
+        -------
+        None
+
+        Returns:
+        --------
+        sweeps : int
+            The number of Dirichlet/Neumann sweeps performed.
+
+        residual : float
+            The interface residual of the last sweep.
+
+        """
+        livingroom, kitchen, entryway, bathroom = self.livingroom, self.kitchen, self.entryway, self.bathroom
+        for room in (livingroom, kitchen, entryway, bathroom):
+            room.linear_solver.start_step()
+        kitchen_relaxation = relaxation.make_relaxation(self.relax, self.theta)
+        entryway_relaxation = relaxation.make_relaxation(self.relax, self.theta)
+        data2_out = self.btemp2
+        data3_out = np.concatenate((self.btemp3, self.btemp4))
+        previous = None
+        for sweep in range(1, self.sweeps + 1):
+            g_13, g_12 = livingroom.temp_gradient_calc(self.btemp3, self.btemp2)
+            g_43 = bathroom.temp_gradient_calc(self.btemp4)
+            kitchen.get_temperature_matrix(g_12)
+            data2_out = kitchen_relaxation(kitchen.get_neumann_temps(), data2_out)
+            entryway.get_temperature_matrix(g_43, g_13)
+            data3_out = entryway_relaxation(np.concatenate(entryway.get_neumann_temps()), data3_out)
+            self.btemp2 = data2_out
+            self.btemp3, self.btemp4 = np.split(data3_out, 2)
+
+            current = np.concatenate((np.concatenate((g_13, g_12))/livingroom.dx, data2_out,
+                                      data3_out, g_43/bathroom.dx))
+            residual = np.inf if previous is None else float(np.max(np.abs(current - previous)))
+            previous = current
+            if residual < self.tol:
+                break
+        self.steps += 1
+        self.time = self.steps*self.dt
+        return sweep, residual
+
+    def run(self, steps, every = 1):
+        """
+        Takes time steps and yields the temperatures every few of them without
+        keeping any history.
+
+        Params:
+        -------
+        steps : int
+            The number of time steps.
+
+        every : int
+            Yield after every this many time steps.
+
+        Yields:
+        -------
+        snapshot : dict
+            'step', 'time', 'sweeps' and 'residual' of the time step and
+            'rooms', the interior temperatures (om1, om2, om3, om4). These are
+            views of the rooms' temperatures of that time level, which are
+            replaced and not overwritten by the next step.
+
+        """
+        for n in range(steps):
+            sweeps, residual = self.step()
+            if (n + 1) % every == 0 or n + 1 == steps:
+                yield {'step': self.steps, 'time': self.time, 'sweeps': sweeps, 'residual': residual,
+                       'rooms': tuple(room.temperature_matrix[1:-1,1:-1] for room in
+                                      (self.livingroom, self.kitchen, self.entryway, self.bathroom))}